@@ -3,10 +3,14 @@
 
 import os
 import sys
+import argparse
 import subprocess
 
-def build_exe():
-    """打包成 exe 文件"""
+def build_exe(onedir=False):
+    """打包成 exe 文件
+
+    onedir=True 时打包成目录：启动时无需解压到临时目录，冷启动更快
+    """
     try:
         # 检查是否安装了 PyInstaller
         import PyInstaller
@@ -22,7 +26,7 @@ def build_exe():
     # 打包命令
     cmd = [
         "pyinstaller",
-        "--onefile",  # 打包成单个文件
+        "--onedir" if onedir else "--onefile",  # 打包成目录 / 单个文件
         "--windowed",  # 不显示控制台窗口
         "--name=TinyPNG_GUI",  # 可执行文件名
         "--hidden-import=tinify",  # 显式包含 tinify 模块
@@ -36,7 +40,13 @@ def build_exe():
     
     # 执行打包
     subprocess.check_call(cmd)
-    print("打包完成！可执行文件在 dist/ 目录中")
+    if onedir:
+        print("打包完成！可执行文件在 dist/TinyPNG_GUI/ 目录中")
+    else:
+        print("打包完成！可执行文件在 dist/ 目录中")
 
 if __name__ == "__main__":
-    build_exe()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="打包 TinyPNG GUI")
+    parser.add_argument("--onedir", action="store_true", help="打包成目录（快速启动版本）")
+    args = parser.parse_args()
+    build_exe(onedir=args.onedir)
\ No newline at end of file
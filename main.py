@@ -1,32 +1,49 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import time
+_START_TIME = time.perf_counter()  # 用于启动耗时测试
+
 import sys
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
-import json
-from tinypng_core import TinyPNGCompressor
+# tinypng_core 不在导入时加载 tinify/requests，窗口可以先显示出来
+from tinypng_core import TinyPNGCompressor, load_tinify, RESIZE_METHODS
+from tinypng_history import RunHistory
+from tinypng_config import ConfigStore
 
 class TinyPNGGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("TinyPNG 图片压缩工具 v1.0.4")
-        self.root.geometry("800x600")
+        self.root.geometry("800x820")
         self.root.resizable(True, True)
         
-        # 配置
+        # 配置（只加载一次，与压缩器共享）
         self.config_file = "config.json"
-        self.config = self.load_config()
+        self.config = ConfigStore(self.config_file)
+        self._loading_config = False
         
         # 压缩器实例
-        self.compressor = TinyPNGCompressor(log_callback=self.log_message)
+        self.compressor = TinyPNGCompressor(log_callback=self.log_message, config=self.config)
+        
+        # 运行历史数据库
+        self.history_file = "tinypng_history.db"
+        try:
+            self.compressor.history = RunHistory(self.history_file)
+        except Exception as e:
+            print(f"无法打开运行历史数据库: {str(e)}")
         
         # 压缩线程
         self.compress_thread = None
         self.is_compressing = False
         
+        # 任务队列：每个任务包含独立的模式、路径、宽度和替换设置
+        self.job_queue = []
+        self.job_queue_lock = threading.Lock()
+        
         self.setup_ui()
         self.load_config_to_ui()
     
@@ -56,6 +73,9 @@ class TinyPNGGUI:
         # 控制按钮区域
         self.setup_control_section(main_frame)
         
+        # 任务队列区域
+        self.setup_queue_section(main_frame)
+        
         # 日志输出区域
         self.setup_log_section(main_frame)
     
@@ -76,7 +96,8 @@ class TinyPNGGUI:
         self.api_key_var.trace('w', self.on_api_key_change)
         
         # 测试按钮
-        ttk.Button(api_frame, text="测试连接", command=self.test_api).grid(row=0, column=2)
+        self.test_api_button = ttk.Button(api_frame, text="测试连接", command=self.test_api)
+        self.test_api_button.grid(row=0, column=2)
         
         # 诊断按钮
         ttk.Button(api_frame, text="诊断问题", command=self.diagnose_issues).grid(row=0, column=3, padx=(5, 0))
@@ -85,6 +106,10 @@ class TinyPNGGUI:
         self.show_api_key_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(api_frame, text="显示", variable=self.show_api_key_var, 
                        command=self.toggle_api_key_visibility).grid(row=0, column=4, padx=(5, 0))
+        
+        # 本月额度
+        self.quota_var = tk.StringVar(value="本月额度: 未知（点击“测试连接”获取）")
+        ttk.Label(api_frame, textvariable=self.quota_var).grid(row=1, column=0, columnspan=5, sticky=tk.W, pady=(5, 0))
     
     def setup_mode_section(self, parent):
         """设置压缩模式区域"""
@@ -144,8 +169,37 @@ class TinyPNGGUI:
         width_entry.grid(row=0, column=1, sticky=tk.W, padx=(0, 20))
         ttk.Label(compress_frame, text="(留空保持原尺寸)").grid(row=0, column=2, sticky=tk.W)
         
+        # 图片高度和缩放方式
+        resize_frame = ttk.Frame(compress_frame)
+        resize_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(resize_frame, text="图片高度:").pack(side=tk.LEFT, padx=(0, 5))
+        self.height_var = tk.StringVar()
+        ttk.Entry(resize_frame, textvariable=self.height_var, width=10).pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(resize_frame, text="缩放方式:").pack(side=tk.LEFT, padx=(0, 5))
+        self.resize_method_var = tk.StringVar(value="scale")
+        ttk.Combobox(resize_frame, textvariable=self.resize_method_var, values=RESIZE_METHODS,
+                     state="readonly", width=8).pack(side=tk.LEFT, padx=(0, 20))
+        
+        self.local_downscale_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(resize_frame, text="上传前本地缩小（需要 Pillow）", variable=self.local_downscale_var).pack(side=tk.LEFT)
+        
+        # git 改动检测
+        git_frame = ttk.Frame(compress_frame)
+        git_frame.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(git_frame, text="只压缩 git 改动，对比版本:").pack(side=tk.LEFT, padx=(0, 5))
+        self.git_since_var = tk.StringVar()
+        ttk.Entry(git_frame, textvariable=self.git_since_var, width=20).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(git_frame, text="(如 HEAD~1、origin/main，留空处理全部文件)").pack(side=tk.LEFT)
+        
         # 绑定宽度设置变化事件
         self.width_var.trace('w', self.on_setting_change)
+        self.height_var.trace('w', self.on_setting_change)
+        self.resize_method_var.trace('w', self.on_setting_change)
+        self.local_downscale_var.trace('w', self.on_setting_change)
+        self.git_since_var.trace('w', self.on_setting_change)
         
         # 选项复选框
         self.replace_var = tk.BooleanVar(value=False)
@@ -157,10 +211,23 @@ class TinyPNGGUI:
         self.auto_open_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(compress_frame, text="压缩后自动打开输出目录", variable=self.auto_open_var).grid(row=1, column=2, sticky=tk.W, pady=(5, 0))
         
+        # 格式转换选项
+        self.convert_webp_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(compress_frame, text="同时生成 WebP", variable=self.convert_webp_var).grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        
+        self.convert_avif_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(compress_frame, text="同时生成 AVIF", variable=self.convert_avif_var).grid(row=2, column=1, sticky=tk.W, pady=(5, 0))
+        
+        self.unity_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(compress_frame, text="Unity 模式（按 .meta 跳过 / 分组）", variable=self.unity_mode_var).grid(row=2, column=2, sticky=tk.W, pady=(5, 0))
+        
         # 绑定变量变化事件，自动保存配置
         self.replace_var.trace('w', self.on_setting_change)
         self.ignore_meta_var.trace('w', self.on_setting_change)
         self.auto_open_var.trace('w', self.on_setting_change)
+        self.convert_webp_var.trace('w', self.on_setting_change)
+        self.convert_avif_var.trace('w', self.on_setting_change)
+        self.unity_mode_var.trace('w', self.on_setting_change)
     
     def setup_control_section(self, parent):
         """设置控制按钮区域"""
@@ -177,16 +244,55 @@ class TinyPNGGUI:
         
         ttk.Button(control_frame, text="清空日志", command=self.clear_log).pack(side=tk.LEFT, padx=(0, 10))
         
+        ttk.Button(control_frame, text="运行历史", command=self.show_history).pack(side=tk.LEFT, padx=(0, 10))
+        
         ttk.Button(control_frame, text="保存配置", command=self.save_config).pack(side=tk.LEFT)
     
+    def setup_queue_section(self, parent):
+        """设置任务队列区域"""
+        # 队列框架
+        queue_frame = ttk.LabelFrame(parent, text="任务队列", padding="5")
+        queue_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        queue_frame.columnconfigure(0, weight=1)
+        
+        # 队列列表
+        self.queue_listbox = tk.Listbox(queue_frame, height=4)
+        self.queue_listbox.grid(row=0, column=0, rowspan=2, sticky=(tk.W, tk.E), padx=(0, 5))
+        
+        # 队列按钮
+        queue_buttons = ttk.Frame(queue_frame)
+        queue_buttons.grid(row=0, column=1, sticky=tk.N)
+        ttk.Button(queue_buttons, text="加入队列", command=self.enqueue_job).pack(fill=tk.X)
+        ttk.Button(queue_buttons, text="移除选中", command=self.remove_selected_job).pack(fill=tk.X, pady=(2, 0))
+        ttk.Button(queue_buttons, text="清空队列", command=self.clear_queue).pack(fill=tk.X, pady=(2, 0))
+        
+        # 并发设置
+        options_frame = ttk.Frame(queue_frame)
+        options_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        self.concurrent_jobs_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="任务并发执行", variable=self.concurrent_jobs_var).pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(options_frame, text="全局并发数:").pack(side=tk.LEFT, padx=(0, 5))
+        self.max_workers_var = tk.StringVar(value="4")
+        ttk.Spinbox(options_frame, from_=1, to=32, textvariable=self.max_workers_var, width=5).pack(side=tk.LEFT, padx=(0, 20))
+        
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="性能分析", variable=self.profile_var).pack(side=tk.LEFT)
+        
+        # 绑定变量变化事件，自动保存配置
+        self.concurrent_jobs_var.trace('w', self.on_setting_change)
+        self.max_workers_var.trace('w', self.on_setting_change)
+        self.profile_var.trace('w', self.on_setting_change)
+    
     def setup_log_section(self, parent):
         """设置日志输出区域"""
         # 日志框架
         log_frame = ttk.LabelFrame(parent, text="日志输出", padding="5")
-        log_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        log_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
-        parent.rowconfigure(5, weight=1)
+        parent.rowconfigure(6, weight=1)
         
         # 日志文本框
         self.log_text = scrolledtext.ScrolledText(log_frame, height=15, width=80)
@@ -206,7 +312,7 @@ class TinyPNGGUI:
         if mode == "file":
             filename = filedialog.askopenfilename(
                 title="选择图片文件",
-                filetypes=[("图片文件", "*.png *.jpg *.jpeg"), ("所有文件", "*.*")]
+                filetypes=[("图片文件", "*.png *.jpg *.jpeg"), ("zip 压缩包", "*.zip"), ("所有文件", "*.*")]
             )
             if filename:
                 self.path_var.set(filename)
@@ -218,42 +324,72 @@ class TinyPNGGUI:
                 self.add_recent_path(dirname)
     
     def test_api(self):
-        """测试 API 连接"""
+        """测试 API 连接（在后台线程执行，点击按钮时强制重新验证）"""
         api_key = self.api_key_var.get().strip()
         if not api_key:
             messagebox.showerror("错误", "请输入 API Key")
             return
         
+        self.test_api_button.config(state="disabled")
+        threading.Thread(target=self.test_api_worker, args=(api_key,), daemon=True).start()
+    
+    def test_api_worker(self, api_key):
+        """API 测试工作线程"""
         try:
             # 设置 API Key
             self.compressor.set_api_key(api_key)
             
             # 测试连接
-            success, message = self.compressor.test_api_connection()
+            success, message, _ = self.compressor.validate_api_key(force=True)
+            self.root.after(0, self.update_quota_display)
             
             if success:
-                messagebox.showinfo("成功", f"API 连接测试成功！\n{message}")
+                self.root.after(0, lambda: messagebox.showinfo("成功", f"API 连接测试成功！\n{message}"))
             else:
-                messagebox.showerror("连接失败", f"API 连接测试失败：\n{message}")
+                self.root.after(0, lambda: messagebox.showerror("连接失败", f"API 连接测试失败：\n{message}"))
                 
         except Exception as e:
-            messagebox.showerror("错误", f"测试过程中出现错误：\n{str(e)}")
+            error = str(e)
+            self.root.after(0, lambda: messagebox.showerror("错误", f"测试过程中出现错误：\n{error}"))
+        finally:
+            self.root.after(0, lambda: self.test_api_button.config(state="normal"))
+    
+    def refresh_quota_async(self):
+        """后台获取额度（使用缓存的验证结果，不会每次都请求网络）"""
+        api_key = self.api_key_var.get().strip()
+        if len(api_key) < 10:
+            return
+        
+        def worker():
+            try:
+                self.compressor.set_api_key(api_key)
+                self.compressor.validate_api_key()
+            except Exception:
+                return
+            self.root.after(0, self.update_quota_display)
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def update_quota_display(self):
+        """更新本月额度显示"""
+        count = self.compressor.get_compression_count()
+        if count is None:
+            return
+        try:
+            quota = int(self.config.get("monthly_quota", 500))
+        except (TypeError, ValueError):
+            quota = 500
+        remaining = max(0, quota - count)
+        self.quota_var.set(f"本月已用: {count} / {quota}，剩余: {remaining}")
     
     def diagnose_issues(self):
-        """诊断压缩问题"""
+        """诊断压缩问题（在后台线程执行，结果逐条显示）"""
         # 检查是否有选择的路径
         path = self.path_var.get()
         if not path:
             messagebox.showwarning("警告", "请先选择一个文件或目录进行诊断")
             return
         
-        # 执行诊断
-        issues = self.compressor.diagnose_compression_issue(path)
-        
-        # 显示诊断结果
-        path_type = "目录" if os.path.isdir(path) else "文件" if os.path.isfile(path) else "路径"
-        result = f"诊断结果 ({path_type}): {path}\n\n" + "\n".join(issues)
-        
         # 创建诊断结果窗口
         dialog = tk.Toplevel(self.root)
         dialog.title("压缩问题诊断")
@@ -263,13 +399,48 @@ class TinyPNGGUI:
         # 创建文本框显示结果
         text_widget = scrolledtext.ScrolledText(dialog, wrap=tk.WORD, padx=10, pady=10)
         text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # 插入诊断结果
-        text_widget.insert(tk.END, result)
         text_widget.config(state=tk.DISABLED)
         
-        # 添加关闭按钮
-        ttk.Button(dialog, text="关闭", command=dialog.destroy).pack(pady=(0, 10))
+        # 按钮
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=(0, 10))
+        full_scan_button = ttk.Button(button_frame, text="完整扫描")
+        full_scan_button.pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="关闭", command=dialog.destroy).pack(side=tk.LEFT)
+        
+        def append_line(line):
+            # 窗口关闭后丢弃剩余结果
+            if not text_widget.winfo_exists():
+                return
+            text_widget.config(state=tk.NORMAL)
+            text_widget.insert(tk.END, f"{line}\n")
+            text_widget.see(tk.END)
+            text_widget.config(state=tk.DISABLED)
+        
+        def run(max_scan_files):
+            try:
+                path_type = "目录" if os.path.isdir(path) else "文件" if os.path.isfile(path) else "路径"
+                self.root.after(0, append_line, f"诊断结果 ({path_type}): {path}\n")
+                self.compressor.diagnose_compression_issue(
+                    path,
+                    callback=lambda line: self.root.after(0, append_line, line),
+                    max_scan_files=max_scan_files
+                )
+            except Exception as e:
+                self.root.after(0, append_line, f"❌ 诊断出错: {str(e)}")
+            finally:
+                self.root.after(0, append_line, "\n诊断完成")
+                self.root.after(0, lambda: full_scan_button.winfo_exists() and full_scan_button.config(state="normal"))
+        
+        def start(max_scan_files):
+            full_scan_button.config(state="disabled")
+            text_widget.config(state=tk.NORMAL)
+            text_widget.delete(1.0, tk.END)
+            text_widget.config(state=tk.DISABLED)
+            threading.Thread(target=run, args=(max_scan_files,), daemon=True).start()
+        
+        full_scan_button.config(command=lambda: start(None))
+        start(self.config.get("diagnose_max_files", 20000))
     
     def on_api_key_change(self, *args):
         """API Key 改变时的处理"""
@@ -330,6 +501,83 @@ class TinyPNGGUI:
         # 自动保存配置
         self.auto_save_config()
     
+    def _build_job(self):
+        """根据当前界面设置生成任务，宽度或高度无效时返回 None"""
+        width_str = self.width_var.get().strip()
+        height_str = self.height_var.get().strip()
+        try:
+            width = int(width_str) if width_str else -1
+            height = int(height_str) if height_str else -1
+        except ValueError:
+            messagebox.showerror("错误", "宽度和高度必须是数字")
+            return None
+        
+        return {
+            "mode": self.mode_var.get(),
+            "path": self.path_var.get(),
+            "width": width,
+            "height": height,
+            "method": self.resize_method_var.get(),
+            "replace": self.replace_var.get()
+        }
+    
+    def _format_job(self, job):
+        """格式化任务的显示文本"""
+        mode_names = {"file": "单文件", "dir": "目录", "recursive": "递归目录"}
+        if job["width"] == -1 and job["height"] == -1:
+            size = "原尺寸"
+        else:
+            width = job["width"] if job["width"] != -1 else "-"
+            height = job["height"] if job["height"] != -1 else "-"
+            size = f"{job['method']} {width}x{height}"
+        replace = "替换" if job["replace"] else "输出到新文件"
+        return f"[{mode_names.get(job['mode'], job['mode'])}] {job['path']}  (尺寸: {size}, {replace})"
+    
+    def refresh_queue_list(self):
+        """刷新任务队列列表"""
+        with self.job_queue_lock:
+            jobs = list(self.job_queue)
+        self.queue_listbox.delete(0, tk.END)
+        for job in jobs:
+            self.queue_listbox.insert(tk.END, self._format_job(job))
+    
+    def enqueue_job(self):
+        """将当前设置加入任务队列（压缩过程中也可加入）"""
+        if not self.path_var.get():
+            messagebox.showerror("错误", "请选择文件或目录")
+            return
+        
+        job = self._build_job()
+        if job is None:
+            return
+        
+        with self.job_queue_lock:
+            self.job_queue.append(job)
+        self.refresh_queue_list()
+    
+    def remove_selected_job(self):
+        """移除选中的任务"""
+        selection = self.queue_listbox.curselection()
+        if not selection:
+            return
+        with self.job_queue_lock:
+            if selection[0] < len(self.job_queue):
+                del self.job_queue[selection[0]]
+        self.refresh_queue_list()
+    
+    def clear_queue(self):
+        """清空任务队列"""
+        with self.job_queue_lock:
+            self.job_queue.clear()
+        self.refresh_queue_list()
+    
+    def _next_job(self):
+        """从队列头部取出一个任务"""
+        with self.job_queue_lock:
+            job = self.job_queue.pop(0) if self.job_queue else None
+        self.root.after(0, self.refresh_queue_list)
+        return job
+    
     def start_compress(self):
         """开始压缩"""
         if self.is_compressing:
@@ -339,64 +587,177 @@ class TinyPNGGUI:
         if not self.validate_input():
             return
         
+        # 队列为空时，把当前选择作为单个任务执行
+        with self.job_queue_lock:
+            queue_empty = not self.job_queue
+        if queue_empty:
+            job = self._build_job()
+            if job is None:
+                return
+            with self.job_queue_lock:
+                self.job_queue.append(job)
+            self.refresh_queue_list()
+        
+        try:
+            int(self.max_workers_var.get())
+        except ValueError:
+            messagebox.showerror("错误", "并发数必须是数字")
+            return
+        
         # 更新 UI 状态
         self.is_compressing = True
         self.start_button.config(state="disabled")
         self.stop_button.config(state="normal")
         
         # 在新线程中执行压缩
-        self.compress_thread = threading.Thread(target=self.compress_worker)
+        self.compress_thread = threading.Thread(target=self.compress_worker,
+                                                args=(self.concurrent_jobs_var.get(),))
         self.compress_thread.daemon = True
         self.compress_thread.start()
     
     def stop_compress(self):
         """停止压缩"""
         self.is_compressing = False
+        self.compressor.request_stop()
         self.log_message("正在停止压缩...")
     
-    def compress_worker(self):
-        """压缩工作线程"""
+    def compress_worker(self, concurrent=False):
+        """压缩工作线程：依次或并发执行队列中的任务，直到队列为空"""
         try:
-            # 重置统计信息
-            self.compressor.reset_stats()
-            
-            # 获取参数
-            mode = self.mode_var.get()
-            path = self.path_var.get()
-            width_str = self.width_var.get().strip()
-            replace = self.replace_var.get()
-            
-            # 设置宽度参数
-            try:
-                width = int(width_str) if width_str else -1
-            except ValueError:
-                self.log_message("错误: 宽度必须是数字")
-                return
+            # 重置统计信息并登记本次运行
+            with self.job_queue_lock:
+                label = "; ".join(job["path"] for job in self.job_queue)
+            self.compressor.apply_config()
+            self.compressor.begin_run(label)
             
             # 设置 API Key
             api_key = self.api_key_var.get().strip()
             self.compressor.set_api_key(api_key)
             
-            # 执行压缩
-            compress_methods = {
-                "file": self.compressor.compress_file,
-                "dir": self.compressor.compress_path,
-                "recursive": self.compressor.compress_path_recursive
-            }
+            # 执行队列中的任务；压缩过程中新加入的任务也会被执行
+            job_threads = []
+            while self.is_compressing:
+                job = self._next_job()
+                if job is None:
+                    job_threads = [t for t in job_threads if t.is_alive()]
+                    if not job_threads:
+                        break
+                    job_threads[0].join(0.2)
+                    continue
+                
+                if concurrent:
+                    thread = threading.Thread(target=self.run_job, args=(job,), daemon=True)
+                    thread.start()
+                    job_threads.append(thread)
+                else:
+                    self.run_job(job)
             
-            if mode in compress_methods:
-                compress_methods[mode](path, width, replace)
-                self.compressor.print_stats()
-                self.log_message("压缩完成!")
-            else:
-                self.log_message(f"未知的压缩模式: {mode}")
+            for thread in job_threads:
+                thread.join()
+            
+            self.compressor.print_stats()
+            self.log_message("压缩完成!")
             
         except Exception as e:
             self.log_message(f"压缩出错: {str(e)}")
         finally:
+            self.compressor.end_run()
+            # 每批结束后更新额度显示（compression_count 随每次压缩响应更新）
+            self.root.after(0, self.update_quota_display)
             # 恢复 UI 状态
             self.root.after(0, self.reset_ui_state)
     
+    def run_job(self, job):
+        """执行单个任务，文件压缩提交到压缩器的共享线程池"""
+        compress_methods = {
+            "file": self.compressor.compress_file,
+            "dir": self.compressor.compress_path,
+            "recursive": self.compressor.compress_path_recursive
+        }
+        
+        mode = job["mode"]
+        if mode not in compress_methods:
+            self.log_message(f"未知的压缩模式: {mode}")
+            return
+        
+        self.log_message(f"开始任务: {self._format_job(job)}")
+        try:
+            compress_methods[mode](job["path"], job["width"], job["replace"],
+                                   height=job["height"], method=job["method"])
+        except Exception as e:
+            self.log_message(f"任务出错 {job['path']}: {str(e)}")
+    
+    def show_history(self):
+        """显示运行历史和趋势"""
+        history = self.compressor.history
+        if history is None:
+            messagebox.showwarning("警告", "运行历史数据库不可用")
+            return
+        
+        runs = history.recent_runs(limit=50)
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("运行历史")
+        dialog.geometry("760x420")
+        dialog.resizable(True, True)
+        
+        # 运行列表
+        columns = ("time", "files", "saved", "ratio", "duration", "throughput")
+        headings = ("时间", "压缩/总数", "节省空间", "压缩比例", "耗时", "吞吐量")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings", height=12)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=110, anchor=tk.CENTER)
+        tree.column("time", width=150)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        fmt = self.compressor.format_file_size
+        for run in runs:
+            duration = max(0.001, (run["finished_at"] or run["started_at"]) - run["started_at"])
+            saved = run["original_size"] - run["compressed_size"]
+            ratio = saved / run["original_size"] * 100 if run["original_size"] else 0.0
+            tree.insert("", tk.END, values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"])),
+                f"{run['compressed_files']}/{run['total_files']}",
+                fmt(saved),
+                f"{ratio:.2f}%",
+                self.compressor.format_duration(duration),
+                f"{run['compressed_files'] / duration * 60:.1f} 个/分钟, {fmt(run['original_size'] / duration)}/s"
+            ))
+        
+        # 趋势汇总：最近 10 次与更早的运行对比
+        ttk.Label(dialog, text=self._history_trend_text(runs)).pack(padx=10, pady=(0, 5), anchor=tk.W)
+        ttk.Button(dialog, text="关闭", command=dialog.destroy).pack(pady=(0, 10))
+    
+    def _history_trend_text(self, runs):
+        """生成吞吐量和节省比例的趋势说明"""
+        def summarize(group):
+            files = sum(run["compressed_files"] for run in group)
+            seconds = sum(max(0.001, run["finished_at"] - run["started_at"]) for run in group)
+            original = sum(run["original_size"] for run in group)
+            saved = sum(run["original_size"] - run["compressed_size"] for run in group)
+            return files / seconds * 60, (saved / original * 100 if original else 0.0)
+        
+        if not runs:
+            return "暂无历史记录"
+        
+        recent_rate, recent_ratio = summarize(runs[:10])
+        text = f"最近 {len(runs[:10])} 次: 平均 {recent_rate:.1f} 个/分钟，节省 {recent_ratio:.2f}%"
+        if len(runs) > 10:
+            older_rate, older_ratio = summarize(runs[10:])
+            text += f"  |  更早: 平均 {older_rate:.1f} 个/分钟，节省 {older_ratio:.2f}%"
+        return text
+    
+    def preload_network_modules(self):
+        """窗口显示后在后台线程预加载 tinify，避免首次压缩时卡顿"""
+        def preload():
+            try:
+                load_tinify()
+            except ImportError as e:
+                self.log_message(f"警告: 无法加载 tinify: {str(e)}")
+        
+        threading.Thread(target=preload, daemon=True).start()
+    
     def reset_ui_state(self):
         """重置 UI 状态"""
         self.is_compressing = False
@@ -410,8 +771,10 @@ class TinyPNGGUI:
             messagebox.showerror("错误", "请输入 API Key")
             return False
         
-        # 检查路径
-        if not self.path_var.get():
+        # 检查路径（队列中已有任务时可不选择）
+        with self.job_queue_lock:
+            has_jobs = bool(self.job_queue)
+        if not self.path_var.get() and not has_jobs:
             messagebox.showerror("错误", "请选择文件或目录")
             return False
         
@@ -426,33 +789,26 @@ class TinyPNGGUI:
         """清空日志"""
         self.log_text.delete(1.0, tk.END)
     
-    def load_config(self):
-        """加载配置"""
-        default_config = {
-            "api_key": "",
-            "width": "",
-            "replace": False,
-            "ignore_meta": True,
-            "auto_open": False,
-            "recent_paths": [],
-            "max_recent_paths": 10
-        }
-        
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return default_config
-        return default_config
-    
     def load_config_to_ui(self):
         """将配置加载到 UI"""
+        # 加载过程中变量变化不触发自动保存，避免未加载的字段覆盖配置
+        self._loading_config = True
         self.api_key_var.set(self.config.get("api_key", ""))
         self.width_var.set(self.config.get("width", ""))
+        self.height_var.set(self.config.get("height", ""))
+        self.resize_method_var.set(self.config.get("resize_method", "scale"))
+        self.local_downscale_var.set(self.config.get("local_downscale", False))
+        self.git_since_var.set(self.config.get("git_since", ""))
         self.replace_var.set(self.config.get("replace", False))
         self.ignore_meta_var.set(self.config.get("ignore_meta", True))
         self.auto_open_var.set(self.config.get("auto_open", False))
+        self.max_workers_var.set(str(self.config.get("max_workers", 4)))
+        self.concurrent_jobs_var.set(self.config.get("concurrent_jobs", False))
+        self.profile_var.set(self.config.get("profile", False))
+        self.convert_webp_var.set(self.config.get("convert_webp", False))
+        self.convert_avif_var.set(self.config.get("convert_avif", False))
+        self.unity_mode_var.set(self.config.get("unity_mode", False))
+        self._loading_config = False
         
         # 加载最近使用的路径
         self.load_recent_paths()
@@ -462,40 +818,62 @@ class TinyPNGGUI:
         return {
             "api_key": self.api_key_var.get(),
             "width": self.width_var.get(),
+            "height": self.height_var.get(),
+            "resize_method": self.resize_method_var.get(),
+            "local_downscale": self.local_downscale_var.get(),
+            "git_since": self.git_since_var.get(),
             "replace": self.replace_var.get(),
             "ignore_meta": self.ignore_meta_var.get(),
             "auto_open": self.auto_open_var.get(),
             "recent_paths": self.config.get("recent_paths", []),
-            "max_recent_paths": self.config.get("max_recent_paths", 10)
+            "max_recent_paths": self.config.get("max_recent_paths", 10),
+            "max_workers": self.max_workers_var.get(),
+            "concurrent_jobs": self.concurrent_jobs_var.get(),
+            "profile": self.profile_var.get(),
+            "convert_webp": self.convert_webp_var.get(),
+            "convert_avif": self.convert_avif_var.get(),
+            "unity_mode": self.unity_mode_var.get()
         }
     
-    def _save_config_to_file(self, config, show_message=False):
-        """保存配置到文件（内部方法）"""
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            if show_message:
-                messagebox.showinfo("成功", "配置已保存")
-        except Exception as e:
-            error_msg = f"保存配置失败: {str(e)}"
-            if show_message:
-                messagebox.showerror("错误", error_msg)
-            else:
-                print(f"自动保存配置失败: {str(e)}")
-    
     def save_config(self):
-        """保存配置"""
-        config = self._get_current_config()
-        self._save_config_to_file(config, show_message=True)
+        """保存配置（立即写入）"""
+        self.config.update(self._get_current_config())
+        try:
+            self.config.flush()
+            messagebox.showinfo("成功", "配置已保存")
+        except OSError as e:
+            messagebox.showerror("错误", f"保存配置失败: {str(e)}")
     
     def auto_save_config(self):
-        """自动保存配置（不显示提示）"""
-        config = self._get_current_config()
-        self._save_config_to_file(config, show_message=False)
+        """自动保存配置（不显示提示）：更新共享配置，由后台延迟合并写入"""
+        if self._loading_config:
+            return
+        self.config.update(self._get_current_config())
+        self.config.schedule_save()
+    
+    def on_close(self):
+        """关闭窗口：写入尚未保存的配置"""
+        try:
+            self.config.flush()
+        except OSError as e:
+            print(f"保存配置失败: {str(e)}")
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
     app = TinyPNGGUI(root)
+    
+    # 启动耗时测试：窗口绘制完成后输出耗时并退出
+    if "--startup-benchmark" in sys.argv:
+        root.update()
+        elapsed = (time.perf_counter() - _START_TIME) * 1000
+        print(f"窗口显示耗时: {elapsed:.1f} ms (tinify 已加载: {'tinify' in sys.modules})")
+        root.destroy()
+        return
+    
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    root.after(200, app.preload_network_modules)
+    root.after(500, app.refresh_quota_async)
     root.mainloop()
 
 if __name__ == "__main__":
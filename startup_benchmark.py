@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(statement, top=15):
+    """使用 -X importtime 统计导入耗时，返回 (总耗时微秒, 最慢的模块列表)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=HERE, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+        return 0, []
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # 格式: import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 模块名前的缩进表示嵌套层级，不能 strip
+        _, self_us, cumulative_us, name = line.replace("import time:", "|", 1).split("|", 3)
+        entries.append((int(cumulative_us), int(self_us), name))
+
+    # 顶层模块（只有一个前导空格）的累计耗时之和即为总耗时
+    total = sum(cumulative for cumulative, _, name in entries if name.startswith(" ") and not name.startswith("  "))
+    entries.sort(reverse=True)
+    return total, entries[:top]
+
+
+def benchmark_window(runs=5):
+    """多次启动 GUI 直到窗口显示，返回每次耗时（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, os.path.join(HERE, "main.py"), "--startup-benchmark"],
+            cwd=HERE, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print("无法启动 GUI（没有图形环境？）")
+            return []
+        # 输出格式: 窗口显示耗时: 123.4 ms (...)
+        timings.append(float(result.stdout.split(":", 1)[1].split("ms")[0]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TinyPNG GUI 启动耗时测试")
+    parser.add_argument("--runs", type=int, default=5, help="窗口启动测试次数")
+    parser.add_argument("--top", type=int, default=15, help="显示最慢的模块数量")
+    parser.add_argument("--imports-only", action="store_true", help="只统计导入耗时，不启动窗口")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("导入耗时 (import main)")
+    print("=" * 50)
+    total, slowest = profile_imports("import main", args.top)
+    print(f"总计: {total / 1000:.1f} ms")
+    for cumulative, self_us, name in slowest:
+        print(f"{cumulative / 1000:8.1f} ms  (自身 {self_us / 1000:6.1f} ms)  {name.strip()}")
+
+    # 对比：已延迟到窗口显示之后的网络库
+    tinify_total, _ = profile_imports("import tinify", 0)
+    if tinify_total:
+        print(f"\n已延迟加载: import tinify 约 {tinify_total / 1000:.1f} ms")
+
+    if args.imports_only:
+        return
+
+    print("\n" + "=" * 50)
+    print(f"窗口显示耗时 ({args.runs} 次)")
+    print("=" * 50)
+    timings = benchmark_window(args.runs)
+    if timings:
+        print(f"中位数: {statistics.median(timings):.1f} ms  最小: {min(timings):.1f} ms  最大: {max(timings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import struct
+import sys
+import types
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tinypng_core
+
+
+def png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def make_png(padding=0, width=4, height=3):
+    """width x height 的 PNG，padding 为额外 tEXt 块的长度（用来模拟可压缩的原图）"""
+    ihdr = png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+    extra = png_chunk(b"tEXt", b"x" * padding) if padding else b""
+    idat = png_chunk(b"IDAT", zlib.compress(b"\0" * (width * 4 + 1) * height))
+    return tinypng_core.PNG_SIGNATURE + ihdr + extra + idat + png_chunk(b"IEND", b"")
+
+
+@pytest.fixture
+def fake_tinify(monkeypatch):
+    """替代 tinify：返回固定的小 PNG，并记录上传次数"""
+    uploads = []
+
+    class Source:
+        def resize(self, **options):
+            return self
+
+        def to_buffer(self):
+            return make_png()
+
+    def from_buffer(data):
+        uploads.append(data)
+        return Source()
+
+    module = types.SimpleNamespace(key="k" * 32, from_buffer=from_buffer)
+    monkeypatch.setattr(tinypng_core, "tinify", module)
+    return uploads
@@ -0,0 +1,60 @@
+import os
+import zipfile
+
+import pytest
+
+from conftest import make_png
+from tinypng_core import TinyPNGCompressor
+
+MEMBERS = ["a/", "a/x.png", "readme.txt", "b/y.png", "b/", "notes.txt", "z.png"]
+
+
+@pytest.fixture
+def compressor(fake_tinify):
+    compressor = TinyPNGCompressor(log_callback=lambda message: None)
+    compressor._tls_configured = True
+    compressor.set_max_workers(4)
+    yield compressor
+    compressor.shutdown()
+
+
+def make_archive(path):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name in MEMBERS:
+            archive.writestr(name, b"" if name.endswith("/") else make_png(padding=200) if name.endswith(".png") else b"text")
+
+
+def test_members_keep_input_order(compressor, tmp_path):
+    source = str(tmp_path / "bundle.zip")
+    make_archive(source)
+    outputs = []
+    for run in range(2):
+        output = str(tmp_path / f"out{run}.zip")
+        compressor.compress_archive(source, output)
+        with zipfile.ZipFile(output) as archive:
+            assert archive.namelist() == MEMBERS
+            assert archive.read("a/x.png") == compressor.add_compressed_marker(make_png())
+        with open(output, 'rb') as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+    assert compressor.stats["compressed_files"] == 6
+
+
+def test_unreadable_member_removes_output(compressor, tmp_path):
+    source = str(tmp_path / "bundle.zip")
+    make_archive(source)
+    # 把 readme.txt 的压缩方式改成不支持的值，读取时抛出 NotImplementedError
+    with open(source, 'rb') as f:
+        data = bytearray(f.read())
+    with zipfile.ZipFile(source) as archive:
+        info = archive.getinfo("readme.txt")
+    data[info.header_offset + 8:info.header_offset + 10] = (99).to_bytes(2, "little")
+    # 中央目录项：文件名位于签名后 46 字节处
+    central = data.find(b"readme.txt", data.index(b"PK\x01\x02")) - 46
+    data[central + 10:central + 12] = (99).to_bytes(2, "little")
+    with open(source, 'wb') as f:
+        f.write(data)
+
+    output = str(tmp_path / "out.zip")
+    compressor.compress_archive(source, output)
+    assert not os.path.exists(output)
@@ -0,0 +1,63 @@
+import http.client
+import urllib.parse
+
+import pytest
+
+from conftest import make_png
+from tinypng_cache_server import SharedCacheClient, start_background_server
+from tinypng_core import TinyPNGCompressor
+
+KEY = "0" * 64 + "-w-1"
+
+
+@pytest.fixture
+def server(tmp_path):
+    server, base_url = start_background_server(directory=str(tmp_path / "cache"), token="secret")
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def make_compressor(base_url, token="secret"):
+    compressor = TinyPNGCompressor(log_callback=lambda message: None)
+    compressor._tls_configured = True
+    compressor.cache_client = SharedCacheClient(base_url, token=token)
+    return compressor
+
+
+def test_round_trip(server):
+    client = SharedCacheClient(server, token="secret")
+    assert client.get(KEY) is None
+    assert client.put(KEY, b"data")
+    assert client.get(KEY) == b"data"
+    assert client.bulk_lookup([KEY, "1" * 64 + "-w-1", "../etc/passwd"]) == {KEY}
+
+
+def test_put_requires_token(server):
+    assert not SharedCacheClient(server).put(KEY, b"forged")
+    assert not SharedCacheClient(server, token="wrong").put(KEY, b"forged")
+    assert SharedCacheClient(server).get(KEY) is None
+
+
+def test_malformed_content_length(server):
+    parsed = urllib.parse.urlparse(server)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=5)
+    connection.putrequest("PUT", f"/cache/{KEY}")
+    connection.putheader("X-Cache-Token", "secret")
+    connection.putheader("Content-Length", "abc")
+    connection.endheaders()
+    assert connection.getresponse().status == 400
+    connection.close()
+
+
+def test_compressor_cache_hit(server, fake_tinify):
+    original = make_png(padding=200)
+
+    first = make_compressor(server)
+    result = first.compress_buffer(original)
+    assert len(fake_tinify) == 1
+
+    second = make_compressor(server)
+    assert second.compress_buffer(original) == result
+    assert len(fake_tinify) == 1
+    assert second.stats["cache_hits"] == 1
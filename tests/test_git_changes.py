@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from tinypng_core import TinyPNGCompressor
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="需要 git")
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def write(path, data=b"png"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """一次提交后：修改、新增未跟踪文件、重命名、删除"""
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    git(tmp_path, "config", "user.name", "test")
+    for name in ["assets/a.png", "assets/ui/b.png", "assets/bg/c.png", "assets/bg/d.png", "other/e.png"]:
+        write(str(tmp_path / name))
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "init")
+
+    write(str(tmp_path / "assets/ui/b.png"), b"modified")
+    write(str(tmp_path / "assets/ui/new file.png"))
+    git(tmp_path, "mv", "assets/bg/c.png", "assets/bg/renamed.png")
+    os.remove(str(tmp_path / "assets/bg/d.png"))
+    write(str(tmp_path / "other/f.png"))
+    return tmp_path
+
+
+def make_compressor(git_since="HEAD"):
+    compressor = TinyPNGCompressor(log_callback=lambda message: None)
+    compressor.git_since = git_since
+    return compressor
+
+
+def test_changed_files(repo):
+    changed = make_compressor().git_changed_files(str(repo / "assets"))
+    assert sorted(changed) == sorted([
+        os.path.join("bg", "renamed.png"),
+        os.path.join("ui", "b.png"),
+        os.path.join("ui", "new file.png"),
+    ])
+
+
+def test_subdirectory_target(repo):
+    changed = make_compressor().git_changed_files(str(repo / "assets" / "ui"))
+    assert sorted(changed) == ["b.png", "new file.png"]
+
+
+def test_walk_candidates_start_with_target(repo):
+    target = str(repo / "assets")
+    groups = list(make_compressor()._walk_candidates(target))
+    assert groups[0] == (target, [], [])
+    assert (os.path.join(target, "ui"), [], ["b.png", "new file.png"]) in groups
+
+
+def test_not_a_repository_falls_back(tmp_path):
+    write(str(tmp_path / "a.png"))
+    compressor = make_compressor()
+    assert compressor.git_changed_files(str(tmp_path)) is None
+    assert list(compressor._walk_candidates(str(tmp_path))) == list(os.walk(str(tmp_path)))
+
+
+@pytest.mark.parametrize("ref", ["no-such-ref", "HEAD~5", "--output={output}"])
+def test_bad_ref_falls_back(repo, tmp_path, ref):
+    output = str(tmp_path / "diff_output")
+    assert make_compressor(ref.format(output=output)).git_changed_files(str(repo / "assets")) is None
+    assert not os.path.exists(output)
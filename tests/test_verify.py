@@ -0,0 +1,73 @@
+import struct
+
+import pytest
+
+from conftest import make_png
+from tinypng_core import TinyPNGCompressor
+
+
+@pytest.fixture
+def compressor():
+    compressor = TinyPNGCompressor(log_callback=lambda message: None)
+    compressor.verify_output = True
+    return compressor
+
+
+def make_jpeg(width, height, eoi=True):
+    """只有 SOF0 和扫描段的 JPEG 结构（不含可解码的像素数据）"""
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    sos = b"\xff\xda" + struct.pack(">HB", 8, 1) + b"\x01\x00\x00\x3f\x00"
+    return b"\xff\xd8" + sof + sos + b"\x12\x34" + (b"\xff\xd9" if eoi else b"")
+
+
+def test_valid_images(compressor):
+    assert compressor.read_image_size(make_png(width=40, height=30)) == (40, 30)
+    assert compressor.read_image_size(make_jpeg(40, 30)) == (40, 30)
+    # 部分编码器在 EOI 后补零
+    assert compressor.check_result(make_jpeg(40, 30), make_jpeg(40, 30) + b"\x00\x00") is None
+
+
+def test_truncated_png(compressor):
+    original = make_png()
+    corrupted = bytearray(original)
+    # IDAT 数据的第一个字节（签名 8 + IHDR 25 + IDAT 长度和类型 8）
+    corrupted[41] ^= 0xFF
+    assert "CRC" in compressor.check_result(original, bytes(corrupted))
+    assert "IEND" in compressor.check_result(original, original[:-12])
+    assert "IEND" in compressor.check_result(original, original[:-5])
+
+
+def test_jpeg_without_eoi(compressor):
+    original = make_jpeg(40, 30)
+    assert compressor.check_result(original, original) is None
+    assert "EOI" in compressor.check_result(original, make_jpeg(40, 30, eoi=False))
+
+
+def test_resize_dimension_mismatch(compressor):
+    original = make_png(width=400, height=300)
+    resize = ("scale", 200, -1)
+    assert compressor.check_result(original, make_png(width=200, height=150), resize) is None
+    # 取整误差 1 像素以内
+    assert compressor.check_result(original, make_png(width=200, height=151), resize) is None
+    assert "尺寸不符" in compressor.check_result(original, make_png(width=300, height=225), resize)
+    # 不缩放时尺寸必须不变
+    assert "尺寸不符" in compressor.check_result(original, make_png(width=200, height=150))
+
+
+def test_no_upscale_allowance(compressor):
+    original = make_png(width=100, height=80)
+    # 目标尺寸大于原图时 TinyPNG 保持原尺寸
+    assert compressor.check_result(original, make_png(width=100, height=80), ("fit", 400, 400)) is None
+    assert compressor.check_result(original, make_png(width=100, height=80), ("cover", 200, 50)) is None
+    # 仍然不能超过目标尺寸和原图尺寸中较大的一个
+    assert "尺寸不符" in compressor.check_result(original, make_png(width=500, height=400), ("fit", 400, 400))
+
+
+def test_verify_failure_is_counted(compressor):
+    original = make_png()
+    with pytest.raises(RuntimeError):
+        compressor._verify_result(original, original[:-12])
+    assert compressor.stats["verify_failed"] == 1
+    compressor.verify_output = False
+    compressor._verify_result(original, original[:-12])
+    assert compressor.stats["verify_failed"] == 1
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""共享压缩缓存服务
+
+多台构建机共用一个缓存，相同的输入（按内容哈希和缩放参数区分）只调用一次 TinyPNG API。
+
+启动服务:
+    python tinypng_cache_server.py --host 0.0.0.0 --port 8765 --dir tinypng_cache --token <共享口令>
+
+设置口令后，PUT 请求必须带 X-Cache-Token 头，防止局域网内其他人覆盖缓存内容。
+
+接口:
+    GET  /cache/<key>   获取压缩结果，不存在返回 404
+    PUT  /cache/<key>   保存压缩结果
+    POST /lookup        批量查询，请求 {"keys": [...]}，返回 {"hits": [...]}
+"""
+
+import os
+import re
+import hmac
+import json
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 缓存键只允许哈希、缩放参数和扩展名中出现的字符，防止路径穿越
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}[0-9A-Za-z_.\-]{0,64}$')
+# 写入口令请求头
+TOKEN_HEADER = "X-Cache-Token"
+
+
+class CacheStore:
+    """按键保存到磁盘的缓存，文件按键的前两位分目录"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def has(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """原子写入，并发写同一个键时结果一致"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """缓存服务的 HTTP 请求处理"""
+
+    store = None
+    token = None  # 设置后 PUT 必须带相同的 X-Cache-Token
+    max_body_size = 64 * 1024 * 1024
+
+    def _key_from_path(self):
+        if not self.path.startswith('/cache/'):
+            return None
+        key = self.path[len('/cache/'):]
+        return key if KEY_PATTERN.match(key) else None
+
+    def _send(self, status, body=b"", content_type="application/octet-stream"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            return None
+        if length <= 0 or length > self.max_body_size:
+            return None
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        key = self._key_from_path()
+        if key is None:
+            self._send(400)
+            return
+        data = self.store.get(key)
+        if data is None:
+            self._send(404)
+        else:
+            self._send(200, data)
+
+    def do_HEAD(self):
+        key = self._key_from_path()
+        self._send(200 if key and self.store.has(key) else 404)
+
+    def do_PUT(self):
+        if self.token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.token):
+            self._send(403)
+            return
+        key = self._key_from_path()
+        data = self._read_body()
+        if key is None or data is None:
+            self._send(400)
+            return
+        self.store.put(key, data)
+        self._send(201)
+
+    def do_POST(self):
+        if self.path != '/lookup':
+            self._send(404)
+            return
+        body = self._read_body()
+        try:
+            keys = json.loads(body.decode('utf-8'))['keys'] if body else []
+        except (ValueError, KeyError, UnicodeDecodeError):
+            self._send(400)
+            return
+        hits = [key for key in keys if isinstance(key, str) and KEY_PATTERN.match(key) and self.store.has(key)]
+        self._send(200, json.dumps({"hits": hits}).encode('utf-8'), "application/json")
+
+    def log_message(self, format, *args):
+        # 默认会把每个请求打印到 stderr，构建机上太吵
+        pass
+
+
+def create_server(host="127.0.0.1", port=8765, directory="tinypng_cache", token=None):
+    """创建缓存服务（port=0 时自动分配端口，便于本机测试）"""
+    handler = type("BoundCacheRequestHandler", (CacheRequestHandler,),
+                   {"store": CacheStore(directory), "token": token or None})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_background_server(host="127.0.0.1", port=0, directory="tinypng_cache", token=None):
+    """在后台线程启动缓存服务，返回 (server, base_url)"""
+    server = create_server(host, port, directory, token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+class SharedCacheClient:
+    """共享缓存客户端：任何网络错误都按未命中处理，不影响压缩"""
+
+    def __init__(self, base_url, timeout=5, log_callback=None, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.log_callback = log_callback
+        self.token = token or None
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def get(self, key):
+        """获取缓存内容，未命中返回 None"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/cache/{key}", timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                self._log(f"警告: 共享缓存读取失败: {str(e)}")
+        except (OSError, ValueError) as e:
+            self._log(f"警告: 共享缓存读取失败: {str(e)}")
+        return None
+
+    def put(self, key, data):
+        """发布压缩结果到缓存"""
+        headers = {TOKEN_HEADER: self.token} if self.token else {}
+        request = urllib.request.Request(f"{self.base_url}/cache/{key}", data=data, method="PUT", headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                return True
+        except (OSError, ValueError) as e:
+            self._log(f"警告: 共享缓存写入失败: {str(e)}")
+            return False
+
+    def bulk_lookup(self, keys):
+        """一次请求查询多个键，返回命中的键集合（请求失败时返回 None）"""
+        body = json.dumps({"keys": list(keys)}).encode('utf-8')
+        request = urllib.request.Request(f"{self.base_url}/lookup", data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return set(json.loads(response.read().decode('utf-8'))['hits'])
+        except (OSError, ValueError, KeyError) as e:
+            self._log(f"警告: 共享缓存批量查询失败: {str(e)}")
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TinyPNG 共享压缩缓存服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（团队共享时使用 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--dir", default="tinypng_cache", help="缓存目录")
+    parser.add_argument("--token", default=os.environ.get("TINYPNG_CACHE_TOKEN"),
+                        help="写入口令（默认读取环境变量 TINYPNG_CACHE_TOKEN）")
+    args = parser.parse_args()
+
+    if not args.token and args.host not in ("127.0.0.1", "localhost"):
+        print("警告: 未设置 --token，网络中的任何人都可以覆盖缓存内容")
+    server = create_server(args.host, args.port, args.dir, args.token)
+    print(f"共享缓存服务已启动: http://{args.host}:{server.server_address[1]}  缓存目录: {os.path.abspath(args.dir)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
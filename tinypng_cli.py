@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""命令行压缩（无界面），适合构建机和性能分析
+
+    python tinypng_cli.py assets/ --recursive --profile
+
+未指定的参数使用 config.json 中的设置（不会修改 config.json）。
+"""
+
+import os
+import sys
+import argparse
+
+from tinypng_core import TinyPNGCompressor, RESIZE_METHODS
+from tinypng_config import ConfigStore
+from tinypng_history import RunHistory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TinyPNG 命令行压缩")
+    parser.add_argument("path", help="要压缩的文件或目录")
+    parser.add_argument("--recursive", "-r", action="store_true", help="递归处理子目录")
+    parser.add_argument("--width", type=int, default=-1, help="压缩后的宽度")
+    parser.add_argument("--height", type=int, default=-1, help="压缩后的高度")
+    parser.add_argument("--method", choices=RESIZE_METHODS, help="缩放方式")
+    parser.add_argument("--replace", action="store_true", help="替换原文件")
+    parser.add_argument("--api-key", help="TinyPNG API Key（默认读取环境变量 TINYPNG_API_KEY 或 config.json）")
+    parser.add_argument("--config", default="config.json", help="配置文件")
+    parser.add_argument("--workers", type=int, help="全局并发数")
+    parser.add_argument("--git-since", help="只压缩自该 git 版本以来改动过的文件（如 HEAD~1、origin/main）")
+    parser.add_argument("--unity", action="store_true", help="Unity 模式：按 .meta 跳过会被重新压缩的纹理，精灵按图集分组")
+    parser.add_argument("--profile", action="store_true", help="记录 cProfile 和时间线")
+    parser.add_argument("--profile-dir", help="性能分析结果目录")
+    args = parser.parse_args()
+
+    config = ConfigStore(args.config)
+    if args.workers is not None:
+        config["max_workers"] = args.workers
+    if args.git_since is not None:
+        config["git_since"] = args.git_since
+    if args.unity:
+        config["unity_mode"] = True
+    if args.profile:
+        config["profile"] = True
+    if args.profile_dir:
+        config["profile_dir"] = args.profile_dir
+
+    api_key = args.api_key or os.environ.get("TINYPNG_API_KEY") or config.get("api_key", "")
+    if not api_key:
+        print("未设置 API Key（--api-key / TINYPNG_API_KEY / config.json）")
+        return 2
+
+    compressor = TinyPNGCompressor(config=config)
+    try:
+        compressor.set_api_key(api_key)
+    except ValueError as e:
+        print(str(e))
+        return 2
+    except ImportError as e:
+        print(f"无法加载 tinify: {str(e)}（pip install -r requirements.txt）")
+        return 1
+    compressor.history = RunHistory()
+
+    if os.path.isfile(args.path):
+        compress = compressor.compress_file
+    elif args.recursive:
+        compress = compressor.compress_path_recursive
+    else:
+        compress = compressor.compress_path
+
+    compressor.begin_run(args.path)
+    error = None
+    try:
+        compress(args.path, args.width, args.replace, height=args.height, method=args.method)
+    except KeyboardInterrupt:
+        compressor.request_stop()
+        print("已停止")
+    except (RuntimeError, ImportError) as e:
+        # 单文件模式下压缩失败会继续抛出；失败已计入统计，这里只输出原因
+        error = e
+        compressor.log(f"压缩出错: {str(e)}")
+    finally:
+        compressor.print_stats()
+        compressor.end_run()
+        compressor.shutdown()
+        compressor.history.close()
+
+    return 1 if error is not None or compressor.stats['failed_files'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
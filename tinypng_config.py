@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+import json
+import tempfile
+import threading
+
+DEFAULT_CONFIG = {
+    "api_key": "",
+    "width": "",
+    "replace": False,
+    "ignore_meta": True,
+    "auto_open": False,
+    "recent_paths": [],
+    "max_recent_paths": 10,
+    "max_workers": 4,
+    "concurrent_jobs": False,
+    "convert_webp": False,
+    "convert_avif": False,
+    "adaptive_skip": True,
+    "embed_marker": True,
+    "skip_threshold": 1.0,
+    "diagnose_max_files": 20000,
+    "api_cache_ttl": 300,
+    "monthly_quota": 500,
+    "cache_server_url": "",
+    "cache_server_token": "",
+    "height": "",
+    "resize_method": "scale",
+    "local_downscale": False,
+    "resize_rules": {},
+    "verify_output": True,
+    "profile": False,
+    "profile_dir": "tinypng_profiles",
+    "git_since": "",
+    "unity_mode": False,
+    "unity_build_targets": []
+}
+
+
+class ConfigStore:
+    """配置存储：启动时加载一次，GUI 和压缩器共享同一份数据
+
+    修改后调用 schedule_save()，在 save_delay 秒内的多次修改会合并成一次写入；
+    写入在后台线程中进行，先写临时文件再重命名，避免写到一半的配置文件。
+    """
+
+    def __init__(self, config_file="config.json", save_delay=0.5):
+        self.config_file = config_file
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        # 写文件串行执行：定时器写入和 flush() 同时发生时，后写入的一定是较新的快照
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._data = dict(DEFAULT_CONFIG)
+        self.load()
+
+    def load(self):
+        """从文件加载配置，缺少的键使用默认值"""
+        if not os.path.exists(self.config_file):
+            return
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._data.update(loaded)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+    def update(self, values):
+        """批量更新配置"""
+        with self._lock:
+            self._data.update(values)
+
+    def snapshot(self):
+        """返回当前配置的副本"""
+        with self._lock:
+            return dict(self._data)
+
+    def schedule_save(self):
+        """延迟保存：save_delay 秒内没有新的修改时才写入文件"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self._write_pending)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即写入（取消等待中的延迟保存），失败时抛出 OSError"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self._write()
+
+    def _write_pending(self):
+        """延迟保存的定时器回调"""
+        with self._lock:
+            self._timer = None
+        try:
+            self._write()
+        except OSError as e:
+            print(f"自动保存配置失败: {str(e)}")
+
+    def _write(self):
+        """原子写入：写临时文件后重命名覆盖（在写锁内取快照）"""
+        with self._write_lock:
+            data = self.snapshot()
+            directory = os.path.dirname(os.path.abspath(self.config_file))
+            fd, temp_path = tempfile.mkstemp(prefix=".config_", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(temp_path, self.config_file)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
@@ -4,25 +4,173 @@
 import os
 import sys
 import shutil
-import tinify
+import json
+import zlib
+import struct
+import time
+import io
+import zipfile
+import hashlib
+import tempfile
+import threading
+import subprocess
+import collections
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# tinify（以及 requests / urllib3）加载较慢，首次使用时才导入，见 load_tinify()
+tinify = None
+
+# 已压缩标记：PNG 私有辅助块类型 / JPEG 注释内容
+COMPRESSED_MARKER = b"TinyPNG_GUI"
+PNG_MARKER_CHUNK = b"tiNy"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 已压缩文件的旁路索引文件名（每个目录一个）
+INDEX_FILE_NAME = ".tinypng_index.json"
+# 支持的转换目标格式 -> MIME 类型
+CONVERT_FORMATS = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'png': 'image/png',
+    'jpg': 'image/jpeg'
+}
+# TinyPNG 支持的缩放方式：scale 只需宽或高，其余需要同时指定宽和高
+RESIZE_METHODS = ['scale', 'fit', 'cover', 'thumb']
+# JPEG 中携带图像尺寸的 SOF 段标记（不含 DHT / JPG / DAC）
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_tinify_lock = threading.Lock()
+# 未启用性能分析时使用的空上下文（nullcontext 无状态，可重复使用）
+_NO_PROFILE = contextlib.nullcontext()
+
+def load_tinify():
+    """按需导入 tinify 模块（线程安全，可在后台线程中预加载）"""
+    global tinify
+    if tinify is None:
+        with _tinify_lock:
+            if tinify is None:
+                import tinify as tinify_module
+                tinify = tinify_module
+    return tinify
+
+class StatsCollector:
+    """线程安全的压缩统计：计数器的读写都在同一把锁内完成"""
+    
+    FIELDS = {
+        'total_files': 0,
+        'compressed_files': 0,
+        'skipped_files': 0,
+        'failed_files': 0,
+        'original_size': 0,
+        'compressed_size': 0,
+        'saved_size': 0,
+        'compression_ratio': 0.0,
+        'converted_files': 0,
+        'cache_hits': 0,
+        'verify_failed': 0,
+        'unity_skipped': 0
+    }
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = dict(self.FIELDS)
+    
+    def __getitem__(self, key):
+        with self._lock:
+            return self._values[key]
+    
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._values[key] = value
+    
+    def increment(self, **deltas):
+        """原子地累加一个或多个计数器"""
+        with self._lock:
+            for key, value in deltas.items():
+                self._values[key] += value
+    
+    def reset(self):
+        """清零所有计数器"""
+        with self._lock:
+            self._values = dict(self.FIELDS)
+    
+    def snapshot(self):
+        """返回当前统计的一致性副本"""
+        with self._lock:
+            return dict(self._values)
+    
+    def __repr__(self):
+        return repr(self.snapshot())
 
 class TinyPNGCompressor:
-    def __init__(self, log_callback=None):
+    def __init__(self, log_callback=None, config=None):
         self.api_key = ""
         self.version = "1.0.4"
         self.log_callback = log_callback  # GUI 日志回调函数
         
+        # 自适应跳过：已带标记或上次节省比例低于阈值（百分比）的文件不再上传
+        self.adaptive_skip = True
+        self.embed_marker = True
+        self.skip_threshold = 1.0
+        self._index_cache = {}
+        self._index_dirty = set()  # 有未写入修改的目录，由 flush_index() 写入
+        
+        # 共享工作线程池：所有目录 / 队列任务共用，max_workers 为全局并发上限
+        self.max_workers = 4
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # 压缩和转换两个线程池共用的 API 请求名额，同时进行的 TinyPNG 请求不超过 max_workers
+        self._api_slots = threading.BoundedSemaphore(self.max_workers)
+        self._index_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        
+        # 格式转换：压缩后额外生成的目标格式（如 ['webp', 'avif']），使用独立线程池并发执行
+        self.convert_formats = []
+        self._convert_executor = None
+        
+        # API 验证结果缓存：api_key -> (验证时间, 是否成功, 消息)
+        self.api_cache_ttl = 300
+        self._api_cache = {}
+        self._api_cache_lock = threading.Lock()
+        
+        # 结果校验：写入 / 替换前检查压缩结果是否完整、尺寸是否符合预期、是否变小
+        self.verify_output = True
+        
+        # 缩放：默认缩放方式、按目录的缩放规则、上传前本地缩小（需要 Pillow）
+        self.resize_method = "scale"
+        self.resize_rules = {}
+        self.local_downscale = False
+        self._pillow_warned = False
+        
+        # 共享缓存服务客户端（SharedCacheClient），配置 cache_server_url 后启用
+        self.cache_client = None
+        self._cache_lookup = {}  # 缓存键 -> 批量查询结果（是否命中）
+        self._cache_lookup_lock = threading.Lock()
+        
+        # 共享配置（ConfigStore），由 GUI 加载后传入
+        self.config = config
+        self._tls_configured = False
+        self._tls_lock = threading.Lock()
+        
         # 压缩统计信息
-        self.stats = {
-            'total_files': 0,
-            'compressed_files': 0,
-            'skipped_files': 0,
-            'failed_files': 0,
-            'original_size': 0,
-            'compressed_size': 0,
-            'saved_size': 0,
-            'compression_ratio': 0.0
-        }
+        self.stats = StatsCollector()
+        
+        # Unity 模式：读取 .meta 导入设置，跳过 Unity 会重新压缩的纹理，精灵按图集分组提交
+        self.unity_mode = False
+        self.unity_build_targets = []
+        
+        # git 改动检测：设置为提交 / 分支名后，目录压缩只处理自该版本以来改动过的文件
+        self.git_since = ""
+        
+        # 性能分析：启用后每次运行记录 cProfile 和时间线，保存到 profile_dir
+        self.profile_enabled = False
+        self.profile_dir = "tinypng_profiles"
+        self.profiler = None
+        
+        # 运行历史（可选，RunHistory 实例），用于记录结果和估算剩余时间
+        self.history = None
+        self.current_run_id = None
+        self.run_started_at = None
         
         # 设置控制台输出编码，解决 PowerShell 中文显示问题
         if sys.platform.startswith('win'):
@@ -37,13 +185,74 @@ class TinyPNGCompressor:
                     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
                 except (AttributeError, OSError):
                     pass
+        
+        if self.config is not None:
+            self.apply_config()
+    
+    def apply_config(self):
+        """从共享配置读取压缩相关设置"""
+        if self.config is None:
+            return
+        
+        try:
+            self.set_max_workers(self.config.get("max_workers", self.max_workers))
+        except (TypeError, ValueError):
+            pass
+        self.adaptive_skip = bool(self.config.get("adaptive_skip", self.adaptive_skip))
+        self.embed_marker = bool(self.config.get("embed_marker", self.embed_marker))
+        try:
+            self.skip_threshold = float(self.config.get("skip_threshold", self.skip_threshold))
+        except (TypeError, ValueError):
+            pass
+        try:
+            self.api_cache_ttl = float(self.config.get("api_cache_ttl", self.api_cache_ttl))
+        except (TypeError, ValueError):
+            pass
+        
+        self.verify_output = bool(self.config.get("verify_output", self.verify_output))
+        self.profile_enabled = bool(self.config.get("profile", self.profile_enabled))
+        self.profile_dir = self.config.get("profile_dir", self.profile_dir) or "tinypng_profiles"
+        self.git_since = (self.config.get("git_since", self.git_since) or "").strip()
+        self.unity_mode = bool(self.config.get("unity_mode", self.unity_mode))
+        self.unity_build_targets = list(self.config.get("unity_build_targets", self.unity_build_targets) or [])
+        self.resize_method = self.config.get("resize_method", self.resize_method) or "scale"
+        self.resize_rules = self.config.get("resize_rules", self.resize_rules) or {}
+        self.local_downscale = bool(self.config.get("local_downscale", self.local_downscale))
+        
+        cache_server_url = (self.config.get("cache_server_url") or "").strip()
+        cache_server_token = (self.config.get("cache_server_token") or "").strip() or None
+        if not cache_server_url:
+            self.cache_client = None
+        elif (self.cache_client is None or self.cache_client.base_url != cache_server_url.rstrip('/')
+              or self.cache_client.token != cache_server_token):
+            from tinypng_cache_server import SharedCacheClient
+            self.cache_client = SharedCacheClient(cache_server_url, log_callback=self.log, token=cache_server_token)
+        
+        self.convert_formats = []
+        if self.config.get("convert_webp", False):
+            self.convert_formats.append("webp")
+        if self.config.get("convert_avif", False):
+            self.convert_formats.append("avif")
     
     def log(self, message):
         """发送日志消息到 GUI 或控制台"""
-        if self.log_callback:
-            self.log_callback(message)
-        else:
-            print(message)
+        with self._span("log", "log"):
+            if self.log_callback:
+                self.log_callback(message)
+            else:
+                print(message)
+    
+    def _span(self, name, category="tinypng", **args):
+        """性能分析时间线中的一个区间，未启用性能分析时为空操作"""
+        if self.profiler is None:
+            return _NO_PROFILE
+        return self.profiler.span(name, category, **args)
+    
+    def _profile_thread(self):
+        """在当前线程启用 cProfile，未启用性能分析时为空操作"""
+        if self.profiler is None:
+            return _NO_PROFILE
+        return self.profiler.profile_thread()
     
     def get_file_size(self, file_path):
         """获取文件大小（字节）"""
@@ -82,58 +291,201 @@ class TinyPNGCompressor:
     
     def reset_stats(self):
         """重置统计信息"""
-        self.stats = {
-            'total_files': 0,
-            'compressed_files': 0,
-            'skipped_files': 0,
-            'failed_files': 0,
-            'original_size': 0,
-            'compressed_size': 0,
-            'saved_size': 0,
-            'compression_ratio': 0.0
-        }
+        self.stats.reset()
     
     def update_stats(self, original_size, compressed_size, success=True):
         """更新统计信息"""
-        self.stats['total_files'] += 1
-        
         if success:
-            self.stats['compressed_files'] += 1
-            self.stats['original_size'] += original_size
-            self.stats['compressed_size'] += compressed_size
-            self.stats['saved_size'] += (original_size - compressed_size)
+            self.stats.increment(total_files=1,
+                                 compressed_files=1,
+                                 original_size=original_size,
+                                 compressed_size=compressed_size,
+                                 saved_size=original_size - compressed_size)
+        else:
+            self.stats.increment(total_files=1, failed_files=1)
+    
+    def add_skipped(self):
+        """跳过文件计数加一"""
+        self.stats.increment(skipped_files=1)
+    
+    def begin_run(self, label=""):
+        """开始一次运行：重置统计并在历史数据库中登记"""
+        self.reset_stats()
+        self.stop_event.clear()
+        with self._cache_lookup_lock:
+            self._cache_lookup = {}
+        self.run_started_at = time.time()
+        self.current_run_id = None
+        self.profiler = None
+        if self.profile_enabled:
+            from tinypng_profile import RunProfiler
+            self.profiler = RunProfiler()
+            self.log("性能分析已启用")
+        if self.history is not None:
+            try:
+                self.current_run_id = self.history.start_run(label)
+            except Exception as e:
+                self.log(f"警告: 无法写入运行历史: {str(e)}")
+    
+    def end_run(self):
+        """结束运行：写入压缩索引，保存汇总统计到历史数据库"""
+        self.flush_index()
+        if self.history is not None and self.current_run_id is not None:
+            try:
+                self.history.finish_run(self.current_run_id, self.stats.snapshot())
+            except Exception as e:
+                self.log(f"警告: 无法写入运行历史: {str(e)}")
+        self.current_run_id = None
+        
+        if self.profiler is not None:
+            profiler, self.profiler = self.profiler, None
+            self.save_profile(profiler)
+    
+    def save_profile(self, profiler):
+        """保存运行报告和性能分析文件（同一前缀），返回运行报告路径"""
+        base_path = os.path.join(self.profile_dir, time.strftime("run_%Y%m%d_%H%M%S"))
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            artifacts = profiler.save(base_path)
+            report = {
+                "started_at": self.run_started_at,
+                "duration": time.time() - self.run_started_at if self.run_started_at else None,
+                "max_workers": self.max_workers,
+                "stats": self.stats.snapshot(),
+                "artifacts": [os.path.basename(path) for path in artifacts]
+            }
+            with open(f"{base_path}_report.json", 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            self.log(f"警告: 无法保存性能分析结果: {str(e)}")
+            return None
+        
+        self.log(f"性能分析结果已保存: {base_path}_report.json")
+        for path in artifacts:
+            self.log(f"  {path}")
+        return f"{base_path}_report.json"
+    
+    def _record_file_history(self, path, original_size, compressed_size, duration, error=None):
+        """记录单个文件结果到历史数据库"""
+        if self.history is None or self.current_run_id is None:
+            return
+        try:
+            self.history.record_file(self.current_run_id, path, original_size, compressed_size, duration, error)
+        except Exception as e:
+            self.log(f"警告: 无法写入运行历史: {str(e)}")
+    
+    def estimate_eta(self, remaining_files, remaining_bytes):
+        """根据历史速率估算剩余秒数，没有历史数据时返回 None"""
+        if self.history is None or remaining_files <= 0:
+            return None
+        try:
+            bytes_per_second, seconds_per_file = self.history.average_rates()
+        except Exception:
+            return None
+        if bytes_per_second is None:
+            return None
+        
+        # 历史速率是单个工作线程的速率，按并发数折算
+        if remaining_bytes > 0:
+            seconds = remaining_bytes / bytes_per_second
         else:
-            self.stats['failed_files'] += 1
+            seconds = remaining_files * seconds_per_file
+        return seconds / max(1, min(self.max_workers, remaining_files))
+    
+    def format_duration(self, seconds):
+        """格式化时长显示"""
+        seconds = int(seconds)
+        if seconds < 60:
+            return f"{seconds} 秒"
+        if seconds < 3600:
+            return f"{seconds // 60} 分 {seconds % 60} 秒"
+        return f"{seconds // 3600} 小时 {seconds % 3600 // 60} 分"
+    
+    def set_max_workers(self, max_workers):
+        """设置全局并发上限（下次创建线程池时生效）"""
+        max_workers = max(1, int(max_workers))
+        with self._executor_lock:
+            if max_workers != self.max_workers:
+                for executor in (self._executor, self._convert_executor):
+                    if executor is not None:
+                        executor.shutdown(wait=False)
+                self._executor = None
+                self._convert_executor = None
+                self._api_slots = threading.BoundedSemaphore(max_workers)
+            self.max_workers = max_workers
+    
+    def get_executor(self):
+        """获取共享的压缩线程池"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="tinypng")
+            return self._executor
+    
+    def get_convert_executor(self):
+        """获取格式转换线程池（与压缩线程池分开，避免压缩任务等待转换时互相阻塞）
+
+        两个线程池的 API 请求共用 _api_slots，总并发仍不超过 max_workers。
+        """
+        with self._executor_lock:
+            if self._convert_executor is None:
+                self._convert_executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix="tinypng-convert")
+            return self._convert_executor
+    
+    def shutdown(self):
+        """关闭共享线程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._convert_executor is not None:
+                self._convert_executor.shutdown(wait=True)
+                self._convert_executor = None
+    
+    def request_stop(self):
+        """请求停止：尚未开始的文件不再压缩"""
+        self.stop_event.set()
     
     def print_stats(self):
         """打印压缩统计信息"""
-        if self.stats['compressed_files'] == 0:
+        stats = self.stats.snapshot()
+        if stats['compressed_files'] == 0:
             self.log("\n=== 压缩统计 ===")
             self.log("没有成功压缩的文件")
             return
         
         # 计算压缩比例
-        if self.stats['original_size'] > 0:
-            self.stats['compression_ratio'] = (self.stats['saved_size'] / self.stats['original_size']) * 100
+        if stats['original_size'] > 0:
+            stats['compression_ratio'] = (stats['saved_size'] / stats['original_size']) * 100
+            self.stats['compression_ratio'] = stats['compression_ratio']
         
         self.log("\n" + "="*50)
         self.log("压缩统计报告")
         self.log("="*50)
-        self.log(f"总文件数: {self.stats['total_files']}")
-        self.log(f"成功压缩: {self.stats['compressed_files']} 个文件")
-        self.log(f"跳过文件: {self.stats['skipped_files']} 个文件")
-        self.log(f"失败文件: {self.stats['failed_files']} 个文件")
+        self.log(f"总文件数: {stats['total_files']}")
+        self.log(f"成功压缩: {stats['compressed_files']} 个文件")
+        self.log(f"跳过文件: {stats['skipped_files']} 个文件")
+        self.log(f"失败文件: {stats['failed_files']} 个文件")
         self.log("-"*50)
-        self.log(f"原始总大小: {self.format_file_size(self.stats['original_size'])}")
-        self.log(f"压缩后大小: {self.format_file_size(self.stats['compressed_size'])}")
-        self.log(f"节省空间: {self.format_file_size(self.stats['saved_size'])}")
-        self.log(f"压缩比例: {self.stats['compression_ratio']:.2f}%")
+        self.log(f"原始总大小: {self.format_file_size(stats['original_size'])}")
+        self.log(f"压缩后大小: {self.format_file_size(stats['compressed_size'])}")
+        self.log(f"节省空间: {self.format_file_size(stats['saved_size'])}")
+        self.log(f"压缩比例: {stats['compression_ratio']:.2f}%")
+        if stats['converted_files']:
+            self.log(f"格式转换: {stats['converted_files']} 个文件")
+        if stats['cache_hits']:
+            self.log(f"共享缓存命中: {stats['cache_hits']} 次")
+        if stats['unity_skipped']:
+            self.log(f"Unity 会重新压缩: {stats['unity_skipped']} 个纹理（已避免上传）")
+        if stats['verify_failed']:
+            self.log(f"校验失败: {stats['verify_failed']} 个文件（已保留原文件）")
         self.log("="*50)
     
     def set_api_key(self, api_key):
         """设置 API Key"""
         self.api_key = api_key
-        tinify.key = api_key
+        load_tinify().key = api_key
         self.log(f"API Key 已设置: {api_key[:10]}...")
         
         # 验证 API Key 格式
@@ -144,7 +496,21 @@ class TinyPNGCompressor:
             raise ValueError("API Key 格式不正确，长度太短")
     
     def test_api_connection(self):
-        """测试 API 连接"""
+        """测试 API 连接，返回 (是否成功, 消息)"""
+        success, message, _ = self._check_api_connection()
+        return success, message
+    
+    def _check_api_connection(self):
+        """测试 API 连接，返回 (是否成功, 消息, 结果是否可以缓存)
+
+        只有验证成功和 Key 被拒绝（AccountError）是 Key 本身的结果，可以缓存；
+        网络、服务器等临时问题下次需要重新验证。
+        """
+        # 导入失败也按连接失败返回；下面的 except 子句需要 tinify 的异常类，所以单独捕获
+        try:
+            tinify = load_tinify()
+        except Exception as e:
+            return False, f"无法加载 tinify: {str(e)}", False
         try:
             if not self.api_key:
                 raise ValueError("API Key 未设置")
@@ -154,20 +520,53 @@ class TinyPNGCompressor:
             
             # 尝试获取账户信息来测试连接
             tinify.validate()
-            return True, "API 连接成功"
+            return True, "API 连接成功", True
         except tinify.AccountError as e:
-            return False, f"API Key 无效: {str(e)}"
+            return False, f"API Key 无效: {str(e)}", True
         except tinify.ClientError as e:
-            return False, f"客户端错误: {str(e)}"
+            return False, f"客户端错误: {str(e)}", False
         except tinify.ServerError as e:
-            return False, f"服务器错误: {str(e)}"
+            return False, f"服务器错误: {str(e)}", False
         except tinify.ConnectionError as e:
-            return False, f"网络连接错误: {str(e)}"
+            return False, f"网络连接错误: {str(e)}", False
         except Exception as e:
-            return False, f"未知错误: {str(e)}"
+            return False, f"未知错误: {str(e)}", False
+    
+    def validate_api_key(self, force=False):
+        """验证当前 API Key，结果在 api_cache_ttl 秒内复用（force=True 时重新验证）
+
+        返回 (是否成功, 消息, 本月已压缩次数)
+        """
+        now = time.time()
+        with self._api_cache_lock:
+            cached = self._api_cache.get(self.api_key)
+        if cached and not force and now - cached[0] < self.api_cache_ttl:
+            return cached[1], cached[2], self.get_compression_count()
+        
+        success, message, cacheable = self._check_api_connection()
+        # 网络问题不缓存，下次重新验证
+        if cacheable:
+            with self._api_cache_lock:
+                self._api_cache[self.api_key] = (now, success, message)
+        return success, message, self.get_compression_count()
+    
+    def get_compression_count(self):
+        """本月已使用的压缩次数（来自最近一次 API 响应，没有请求过时为 None）"""
+        if tinify is None:
+            return None
+        return getattr(tinify, 'compression_count', None)
     
     def _fix_tls_certificate_issue(self):
-        """修复 TLS 证书问题"""
+        """修复 TLS 证书问题（每个进程只需执行一次）"""
+        with self._tls_lock:
+            if not self._tls_configured:
+                with self._span("tls_setup", "network"):
+                    self._apply_tls_fix()
+                self._tls_configured = True
+    
+    def _apply_tls_fix(self):
+        """设置 certifi 证书和 tinify 的 SSL 上下文"""
+        tinify = load_tinify()
         try:
             import certifi
             import ssl
@@ -233,148 +632,790 @@ class TinyPNGCompressor:
             except:
                 pass
     
-    def diagnose_compression_issue(self, path):
-        """诊断压缩问题"""
+    def diagnose_compression_issue(self, path, callback=None, max_scan_files=None):
+        """诊断压缩问题
+
+        网络相关检查在后台线程中并发执行，同时进行本地检查；每得到一条结果就调用
+        callback(line)（如果提供，网络检查的结果在后台线程中回调）。max_scan_files 限制目录扫描的文件数量，None 表示完整扫描。
+        """
         issues = []
+        report_lock = threading.Lock()
         
-        # 检查 API Key
-        if not self.api_key:
-            issues.append("❌ API Key 未设置")
-        else:
-            success, message = self.test_api_connection()
-            if not success:
-                issues.append(f"❌ API 连接问题: {message}")
-            else:
-                issues.append("✅ API 连接正常")
+        def report(line):
+            # 网络检查的结果从后台线程报告
+            with report_lock:
+                issues.append(line)
+                if callback:
+                    callback(line)
+        
+        def report_check(future):
+            try:
+                report(future.result())
+            except Exception as e:
+                report(f"❌ 检查出错: {str(e)}")
+        
+        # 网络检查（API 验证、网络连通、TLS 证书）并发执行，每项完成时立即报告，不等待目录扫描
+        executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="tinypng-diagnose")
+        for check in (self._check_api, self._check_network, self._check_tls):
+            executor.submit(check).add_done_callback(report_check)
         
         # 检查路径
         if not os.path.exists(path):
-            issues.append(f"❌ 路径不存在: {path}")
+            report(f"❌ 路径不存在: {path}")
         elif os.path.isfile(path):
-            issues.append("✅ 文件存在")
+            report("✅ 文件存在")
             
             # 检查文件大小
             size = self.get_file_size(path)
             if size == 0:
-                issues.append("❌ 文件大小为0")
+                report("❌ 文件大小为0")
             else:
-                issues.append(f"✅ 文件大小: {self.format_file_size(size)}")
+                report(f"✅ 文件大小: {self.format_file_size(size)}")
             
             # 检查文件权限
             if not os.access(path, os.R_OK):
-                issues.append("❌ 文件无读取权限")
+                report("❌ 文件无读取权限")
             else:
-                issues.append("✅ 文件可读")
+                report("✅ 文件可读")
             
             # 检查文件扩展名
             _, ext = os.path.splitext(path)
-            if ext.lower() not in ['.png', '.jpg', '.jpeg']:
-                issues.append(f"❌ 不支持的文件类型: {ext}")
+            if ext.lower() not in ['.png', '.jpg', '.jpeg', '.zip']:
+                report(f"❌ 不支持的文件类型: {ext}")
             else:
-                issues.append(f"✅ 支持的文件类型: {ext}")
+                report(f"✅ 支持的文件类型: {ext}")
                 
         elif os.path.isdir(path):
-            issues.append("✅ 目录存在")
+            report("✅ 目录存在")
             
             # 检查目录权限
             if not os.access(path, os.R_OK):
-                issues.append("❌ 目录无读取权限")
+                report("❌ 目录无读取权限")
             else:
-                issues.append("✅ 目录可读")
+                report("✅ 目录可读")
             
             # 检查目录是否可写（用于创建输出目录）
             if not os.access(path, os.W_OK):
-                issues.append("❌ 目录无写入权限")
+                report("❌ 目录无写入权限")
             else:
-                issues.append("✅ 目录可写")
+                report("✅ 目录可写")
             
-            # 统计目录中的图片文件
-            image_count = 0
-            total_files = 0
-            image_files = []
-            try:
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        total_files += 1
-                        _, ext = os.path.splitext(file)
-                        if ext.lower() in ['.png', '.jpg', '.jpeg']:
-                            image_count += 1
-                            # 记录前几个图片文件作为示例
-                            if len(image_files) < 5:
-                                rel_path = os.path.relpath(os.path.join(root, file), path)
-                                image_files.append(rel_path)
-                
-                # 计算目录总大小
-                total_size = self.get_directory_size(path)
-                issues.append(f"✅ 目录统计: {image_count} 个图片文件 / {total_files} 个总文件")
-                issues.append(f"📊 目录总大小: {self.format_file_size(total_size)}")
-                
-                if image_count == 0:
-                    issues.append("⚠️ 目录中没有找到支持的图片文件")
-                else:
-                    issues.append(f"📁 图片文件示例: {', '.join(image_files)}")
-                    if image_count > 5:
-                        issues.append(f"📁 ... 还有 {image_count - 5} 个图片文件")
-            except Exception as e:
-                issues.append(f"❌ 目录扫描失败: {str(e)}")
+            self._scan_directory(path, report, max_scan_files)
         else:
-            issues.append(f"❌ 路径既不是文件也不是目录: {path}")
+            report(f"❌ 路径既不是文件也不是目录: {path}")
         
-        # 检查网络连接和 TLS 证书
-        self._check_network_and_tls(issues)
+        # 等待尚未完成的网络检查（回调在工作线程中执行，shutdown 返回时已全部报告）
+        executor.shutdown(wait=True)
         
         return issues
     
-    def compress_core(self, inputFile, outputFile, img_width, replace=False):
-        """压缩的核心逻辑（简化版本，基于原始 tinypng.py）"""
+    def _scan_directory(self, path, report, max_scan_files=None):
+        """一次遍历统计目录中的文件数量和大小，超过 max_scan_files 时停止（抽样结果）"""
+        image_count = 0
+        total_files = 0
+        total_size = 0
+        image_files = []
+        truncated = False
         try:
-            # 修复 TLS 证书问题
-            self._fix_tls_certificate_issue()
-            
-            # 执行压缩（简化逻辑，直接使用 tinify）
-            self.log(f"正在压缩: {inputFile}")
-            self.log(f"输出文件: {outputFile}")
-            self.log(f"当前 tinify.key: {tinify.key[:10] if tinify.key else 'None'}...")
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    if max_scan_files is not None and total_files >= max_scan_files:
+                        truncated = True
+                        break
+                    total_files += 1
+                    try:
+                        total_size += os.path.getsize(os.path.join(root, file))
+                    except OSError:
+                        pass
+                    _, ext = os.path.splitext(file)
+                    if ext.lower() in ['.png', '.jpg', '.jpeg']:
+                        image_count += 1
+                        # 记录前几个图片文件作为示例
+                        if len(image_files) < 5:
+                            rel_path = os.path.relpath(os.path.join(root, file), path)
+                            image_files.append(rel_path)
+                if truncated:
+                    break
             
-            source = tinify.from_file(inputFile)
-            self.log(f"tinify.from_file() 成功")
+            if truncated:
+                report(f"⚠️ 目录较大，仅扫描了前 {total_files} 个文件，以下统计为抽样结果（可使用完整扫描）")
+            report(f"✅ 目录统计: {image_count} 个图片文件 / {total_files} 个总文件")
+            report(f"📊 目录总大小: {self.format_file_size(total_size)}")
             
-            if img_width != -1:
-                self.log(f"调整图片宽度为: {img_width}")
-                resized = source.resize(method="scale", width=img_width)
-                resized.to_file(outputFile)
+            if image_count == 0:
+                report("⚠️ 目录中没有找到支持的图片文件")
             else:
-                source.to_file(outputFile)
-            
-            self.log(f"文件保存成功")
-            
-            # 获取文件大小用于统计
-            original_size = self.get_file_size(inputFile)
-            compressed_size = self.get_file_size(outputFile)
-            self.update_stats(original_size, compressed_size, True)
+                report(f"📁 图片文件示例: {', '.join(image_files)}")
+                if image_count > 5:
+                    report(f"📁 ... 还有 {image_count - 5} 个图片文件")
+        except Exception as e:
+            report(f"❌ 目录扫描失败: {str(e)}")
+    
+    def has_compressed_marker(self, data):
+        """检查图片数据中是否带有已压缩标记"""
+        if data.startswith(PNG_SIGNATURE):
+            pos = len(PNG_SIGNATURE)
+            while pos + 8 <= len(data):
+                length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+                if chunk_type == PNG_MARKER_CHUNK:
+                    return True
+                if chunk_type in (b"IDAT", b"IEND"):
+                    return False
+                pos += 12 + length
+            return False
+
+        if data.startswith(b"\xff\xd8"):
+            pos = 2
+            while pos + 4 <= len(data) and data[pos] == 0xFF:
+                marker = data[pos + 1]
+                if marker == 0xDA:  # SOS 之后是图像数据
+                    return False
+                length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+                if marker == 0xFE and data[pos + 4:pos + 2 + length].startswith(COMPRESSED_MARKER):
+                    return True
+                pos += 2 + length
+        return False
+
+    def add_compressed_marker(self, data):
+        """在图片数据中嵌入已压缩标记（PNG 辅助块或 JPEG 注释），不支持的格式原样返回"""
+        if self.has_compressed_marker(data):
+            return data
+
+        if data.startswith(PNG_SIGNATURE):
+            # 插入到 IHDR 之后，解码器会忽略未知的辅助块
+            ihdr_length = struct.unpack(">I", data[8:12])[0]
+            pos = len(PNG_SIGNATURE) + 12 + ihdr_length
+            crc = zlib.crc32(PNG_MARKER_CHUNK + COMPRESSED_MARKER) & 0xFFFFFFFF
+            chunk = struct.pack(">I", len(COMPRESSED_MARKER)) + PNG_MARKER_CHUNK + COMPRESSED_MARKER + struct.pack(">I", crc)
+            return data[:pos] + chunk + data[pos:]
+
+        if data.startswith(b"\xff\xd8"):
+            # 插入到 APPn 段之后，保持 JFIF/EXIF 头部位置不变
+            pos = 2
+            while pos + 4 <= len(data) and data[pos] == 0xFF and 0xE0 <= data[pos + 1] <= 0xEF:
+                pos += 2 + struct.unpack(">H", data[pos + 2:pos + 4])[0]
+            segment = b"\xff\xfe" + struct.pack(">H", len(COMPRESSED_MARKER) + 2) + COMPRESSED_MARKER
+            return data[:pos] + segment + data[pos:]
+
+        return data
+
+    def _load_index(self, directory):
+        """加载目录的压缩记录索引（调用方需持有 _index_lock）"""
+        if directory in self._index_cache:
+            return self._index_cache[directory]
+
+        index = {}
+        index_path = os.path.join(directory, INDEX_FILE_NAME)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+        self._index_cache[directory] = index
+        return index
+
+    def _record_index(self, inputFile, saved_ratio):
+        """记录文件本次压缩的节省比例到旁路索引"""
+        directory = os.path.dirname(os.path.abspath(inputFile))
+        try:
+            stat = os.stat(inputFile)
+        except OSError:
+            return
+
+        # 只更新内存中的索引，目录处理完后由 flush_index() 一次写入
+        with self._index_lock:
+            index = self._load_index(directory)
+            index[os.path.basename(inputFile)] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'saved_ratio': round(saved_ratio, 2)
+            }
+            self._index_dirty.add(directory)
+
+    def flush_index(self):
+        """把有修改的目录索引写入文件（先写临时文件再重命名，避免写到一半的索引）"""
+        with self._index_lock:
+            pending = {directory: dict(self._index_cache[directory]) for directory in self._index_dirty}
+            self._index_dirty = set()
+
+        for directory, index in pending.items():
+            fd, temp_path = None, None
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix=".tinypng_index_", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False)
+                os.replace(temp_path, os.path.join(directory, INDEX_FILE_NAME))
+            except OSError as e:
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                self.log(f"警告: 无法写入压缩索引: {str(e)}")
+
+    def should_skip(self, inputFile):
+        """判断文件是否可以跳过（不产生任何网络请求）"""
+        if not self.adaptive_skip:
+            return False
+
+        # 已带压缩标记
+        try:
+            with open(inputFile, 'rb') as f:
+                head = f.read(65536)
+        except OSError:
+            return False
+        if self.has_compressed_marker(head):
+            self.log(f"跳过已压缩文件（带标记）: {inputFile}")
+            return True
+
+        # 文件未变化且上次节省比例低于阈值
+        directory = os.path.dirname(os.path.abspath(inputFile))
+        with self._index_lock:
+            entry = self._load_index(directory).get(os.path.basename(inputFile))
+        if entry:
+            try:
+                stat = os.stat(inputFile)
+            except OSError:
+                return False
+            if (entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime
+                    and entry.get('saved_ratio', 100.0) < self.skip_threshold):
+                self.log(f"跳过低收益文件（上次节省 {entry['saved_ratio']:.2f}%）: {inputFile}")
+                return True
+        return False
+
+    def unity_recompression_reason(self, inputFile):
+        """Unity 模式下读取文件的 .meta，返回 (跳过原因或 None, 导入设置或 None)"""
+        from tinypng_unity import read_texture_settings, recompression_reason
+        settings = read_texture_settings(inputFile + ".meta")
+        return recompression_reason(settings, self.unity_build_targets), settings
+    
+    def plan_unity_tasks(self, tasks):
+        """Unity 模式：跳过 Unity 会重新压缩的纹理，其余按图集分组排序后返回
+
+        同一图集（spritePackingTag）的精灵连续提交，同一图集的文件会相继完成；
+        各组及组内按大小从大到小排列，大文件先开始上传，批次末尾由小精灵填满线程池。
+        """
+        groups = {}  # 图集名（无图集时为文件路径）-> [(大小, 任务)]
+        atlases = set()
+        avoided_files, avoided_bytes = 0, 0
+        for task in tasks:
+            reason, settings = self.unity_recompression_reason(task[0])
+            size = self.get_file_size(task[0])
+            if reason is not None:
+                self.log(f"跳过 Unity 会重新压缩的纹理（{reason}）: {task[0]}")
+                self.add_skipped()
+                self.stats.increment(unity_skipped=1)
+                avoided_files += 1
+                avoided_bytes += size
+                continue
             
-            # 如果需要替换原文件
-            if replace:
-                shutil.move(outputFile, inputFile)
-                self.log(f"已替换原文件: {inputFile}")
+            tag = settings["packing_tag"] if settings else ""
+            if tag:
+                atlases.add(tag)
+            groups.setdefault(f"atlas:{tag}" if tag else task[0], []).append((size, task))
+        
+        ordered = []
+        for group in sorted(groups.values(), key=lambda items: sum(size for size, _ in items), reverse=True):
+            ordered.extend(task for _, task in sorted(group, key=lambda item: item[0], reverse=True))
+        
+        sprite_count = sum(len(groups[f"atlas:{tag}"]) for tag in atlases)
+        self.log(f"Unity 模式: 避免上传 {avoided_files} 个纹理（{self.format_file_size(avoided_bytes)}），"
+                 f"待压缩 {len(ordered)} 个，其中 {sprite_count} 个精灵属于 {len(atlases)} 个图集")
+        return ordered
+    
+    def read_image_size(self, data):
+        """解析 PNG / JPEG 结构并返回 (宽, 高)，数据不完整或损坏时抛出 ValueError
+
+        PNG 逐块校验 CRC 并要求以 IEND 结束；JPEG 要求有 SOF 段且以 EOI 结束。
+        只解析文件结构，不解码像素，开销远小于一次网络请求。
+        """
+        if data.startswith(PNG_SIGNATURE):
+            pos = len(PNG_SIGNATURE)
+            size = None
+            while pos + 12 <= len(data):
+                length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+                end = pos + 12 + length
+                if end > len(data):
+                    break
+                crc = struct.unpack(">I", data[end - 4:end])[0]
+                if zlib.crc32(data[pos + 4:end - 4]) & 0xFFFFFFFF != crc:
+                    raise ValueError(f"PNG 块 {chunk_type.decode('latin-1')} CRC 校验失败")
+                if size is None:
+                    if chunk_type != b"IHDR":
+                        raise ValueError("PNG 缺少 IHDR")
+                    size = struct.unpack(">II", data[pos + 8:pos + 16])
+                if chunk_type == b"IEND":
+                    return size
+                pos = end
+            raise ValueError("PNG 数据不完整（缺少 IEND）")
+
+        if data.startswith(b"\xff\xd8"):
+            pos = 2
+            size = None
+            while pos + 4 <= len(data):
+                if data[pos] != 0xFF:
+                    raise ValueError("JPEG 段结构损坏")
+                marker = data[pos + 1]
+                if marker == 0xFF:  # 填充字节
+                    pos += 1
+                    continue
+                if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # 无长度的独立标记
+                    pos += 2
+                    continue
+                if marker == 0xDA:
+                    break
+                length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+                if marker in JPEG_SOF_MARKERS and pos + 9 <= len(data):
+                    height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+                    size = (width, height)
+                pos += 2 + length
             else:
-                self.log(f"压缩完成: {outputFile}")
-            
-            self.log(f"  原始大小: {self.format_file_size(original_size)} -> 压缩后: {self.format_file_size(compressed_size)}")
+                raise ValueError("JPEG 数据不完整（缺少图像数据）")
+            if size is None:
+                raise ValueError("JPEG 缺少 SOF 段")
+            # 部分编码器会在 EOI 后补零
+            if not data.rstrip(b"\x00").endswith(b"\xff\xd9"):
+                raise ValueError("JPEG 数据不完整（缺少 EOI）")
+            return size
+
+        raise ValueError("无法识别的图片格式")
+    
+    def _expected_size(self, original_size, resize):
+        """根据原图尺寸和缩放参数计算预期输出尺寸"""
+        if resize is None:
+            return original_size
+        method, width, height = resize
+        original_width, original_height = original_size
+        if method == "scale":
+            if width != -1:
+                return (width, round(original_height * width / original_width))
+            return (round(original_width * height / original_height), height)
+        if method == "fit":
+            factor = min(width / original_width, height / original_height)
+            return (round(original_width * factor), round(original_height * factor))
+        return (width, height)
+    
+    def check_result(self, data, result, resize=None):
+        """校验压缩结果是否完整、尺寸是否符合预期，通过时返回 None，否则返回失败原因
+
+        是否变小不在这里判断：没有变小属于正常情况（图片已是最优），由调用方按跳过处理。
+        """
+        try:
+            size = self.read_image_size(result)
+        except ValueError as e:
+            return f"压缩结果无法解析: {str(e)}"
+        
+        try:
+            original_size = self.read_image_size(data)
+        except ValueError:
+            # 原图结构不规范时只检查结果本身
+            return None
+        if 0 in original_size:
+            return None
+        
+        expected = self._expected_size(original_size, resize)
+        if abs(size[0] - expected[0]) <= 1 and abs(size[1] - expected[1]) <= 1:
+            return None
+        # 目标尺寸大于原图时 TinyPNG 不会放大，只要求不超过目标尺寸
+        if resize is not None and (expected[0] > original_size[0] or expected[1] > original_size[1]):
+            if size[0] <= max(expected[0], original_size[0]) and size[1] <= max(expected[1], original_size[1]):
+                return None
+        return f"尺寸不符: {size[0]}x{size[1]}，预期 {expected[0]}x{expected[1]}"
+    
+    def _verify_result(self, data, result, resize=None):
+        """校验失败时计数并抛出 RuntimeError，调用方保留原始数据"""
+        if not self.verify_output:
+            return
+        with self._span("verify"):
+            error = self.check_result(data, result, resize)
+        if error is not None:
+            self.stats.increment(verify_failed=1)
+            raise RuntimeError(f"校验失败: {error}")
+    
+    def _match_resize_rule(self, path):
+        """查找适用于文件的目录缩放规则（最长匹配优先）
+
+        规则的键为目录：绝对路径按前缀匹配，相对路径匹配文件所在路径中的任意一段。
+        """
+        directory = os.path.dirname(os.path.abspath(path)).replace('\\', '/')
+        best_key, best_rule = None, None
+        for key, rule in self.resize_rules.items():
+            normalized = key.replace('\\', '/').rstrip('/')
+            if os.path.isabs(key):
+                matched = directory == normalized or directory.startswith(normalized + '/')
+            else:
+                matched = f"/{normalized.strip('/')}/" in f"{directory}/"
+            if matched and (best_key is None or len(normalized) > len(best_key)):
+                best_key, best_rule = normalized, rule
+        return best_rule
+    
+    def resolve_resize(self, path, width=-1, height=-1, method=None):
+        """确定文件的缩放参数，返回 (方式, 宽, 高)，不需要缩放时返回 None"""
+        method = method or self.resize_method
+        rule = self._match_resize_rule(path) if self.resize_rules else None
+        if rule:
+            method = rule.get("method", method)
+            width = int(rule.get("width", -1))
+            height = int(rule.get("height", -1))
+        
+        if width == -1 and height == -1:
+            return None
+        if method not in RESIZE_METHODS:
+            self.log(f"不支持的缩放方式: {method}，使用 scale")
+            method = "scale"
+        
+        # scale 只能指定宽或高之一；fit/cover/thumb 必须同时指定
+        if method == "scale" and width != -1 and height != -1:
+            method = "fit"
+        elif method != "scale" and (width == -1 or height == -1):
+            method = "scale"
+        return (method, width, height)
+    
+    def _local_downscale(self, data, resize):
+        """上传前在本地缩小图片，减少上传数据量；缩小幅度很小、结果没有变小或没有 Pillow 时原样返回"""
+        try:
+            from PIL import Image
+        except ImportError:
+            if not self._pillow_warned:
+                self._pillow_warned = True
+                self.log("警告: 未安装 Pillow，无法本地预缩放（pip install Pillow）")
+            return data
+        
+        method, target_width, target_height = resize
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+                if method == "scale":
+                    factor = target_width / width if target_width != -1 else target_height / height
+                elif method == "fit":
+                    factor = min(target_width / width, target_height / height)
+                else:
+                    # cover / thumb 需要覆盖目标区域，按较大的比例缩小，裁剪交给 TinyPNG
+                    factor = max(target_width / width, target_height / height)
+                
+                # 缩小不到 10% 时重新编码不划算
+                if factor >= 0.9:
+                    return data
                 
+                size = (max(1, round(width * factor)), max(1, round(height * factor)))
+                image_format = image.format
+                info = image.info
+                if image.mode in ("P", "1"):
+                    image = image.convert("RGBA")
+                resized = image.resize(size, Image.LANCZOS)
+                
+                output = io.BytesIO()
+                if image_format == "JPEG":
+                    # 保留 EXIF（方向、拍摄信息等），压缩时 TinyPNG 会按需去除
+                    resized.save(output, "JPEG", quality=95, icc_profile=info.get("icc_profile"), exif=info.get("exif", b""))
+                else:
+                    resized.save(output, "PNG")
         except Exception as e:
-            error_msg = f"压缩失败: {str(e)}"
-            self.log(f"压缩失败 {inputFile}: {error_msg}")
-            self.update_stats(0, 0, False)
-            raise RuntimeError(error_msg)
+            self.log(f"警告: 本地预缩放失败，上传原图: {str(e)}")
+            return data
+        
+        # 重新编码可能比原图还大（如原图是高压缩率的 JPEG），此时上传原图
+        if len(output.getvalue()) >= len(data):
+            self.log("本地预缩放后没有变小，上传原图")
+            return data
+        
+        self.log(f"本地预缩放: {width}x{height} -> {size[0]}x{size[1]}，"
+                 f"上传 {self.format_file_size(len(output.getvalue()))}（原 {self.format_file_size(len(data))}）")
+        return output.getvalue()
     
-    def compress_file(self, inputFile, width=-1, replace=False):
+    def _upload_source(self, data, resize=None):
+        """上传图片数据，返回 tinify Source（已附加缩放参数）"""
+        tinify = load_tinify()
+        
+        # 修复 TLS 证书问题
+        self._fix_tls_certificate_issue()
+        
+        if resize is not None and self.local_downscale:
+            data = self._local_downscale(data, resize)
+        
+        with self._api_slots, self._span("upload", "network", bytes=len(data)):
+            source = tinify.from_buffer(data)
+        self.log(f"tinify.from_buffer() 成功")
+        
+        if resize is not None:
+            method, width, height = resize
+            options = {"method": method}
+            if width != -1:
+                options["width"] = width
+            if height != -1:
+                options["height"] = height
+            self.log(f"调整图片尺寸: {method} {width if width != -1 else '-'} x {height if height != -1 else '-'}")
+            source = source.resize(**options)
+        return source
+    
+    def _finish_result(self, source, data, resize=None):
+        """下载压缩结果，校验后嵌入压缩标记
+
+        不缩放且结果没有比原图小时返回 None（在嵌入标记之前比较），调用方保留原图。
+        """
+        with self._api_slots, self._span("download", "network"):
+            result = source.to_buffer()
+        self._verify_result(data, result, resize)
+        if resize is None and len(result) >= len(data):
+            return None
+        if self.embed_marker:
+            result = self.add_compressed_marker(result)
+        return result
+    
+    def compress_buffer(self, data, resize=None):
+        """压缩内存中的图片数据，返回压缩后的数据（已嵌入压缩标记）
+
+        resize 为 resolve_resize() 返回的 (方式, 宽, 高)，None 表示保持原尺寸；
+        压缩后没有变小时返回 None
+        """
+        return self._compress_with_cache(data, resize)[0]
+    
+    def cache_key(self, data, resize=None):
+        """共享缓存键：输入内容哈希 + 缩放参数"""
+        digest = hashlib.sha256(data).hexdigest()
+        if resize is None:
+            return f"{digest}-w-1"
+        method, width, height = resize
+        # 本地预缩放的结果与 TinyPNG 直接缩放略有差异，单独缓存
+        suffix = "-l" if self.local_downscale else ""
+        if method == "scale" and height == -1:
+            return f"{digest}-w{width}{suffix}"
+        return f"{digest}-{method}-w{width}-h{height}{suffix}"
+    
+    def prefetch_cache(self, items):
+        """一次请求批量查询多个文件是否在共享缓存中，已知未命中的文件之后不再单独查询
+
+        items 为 (文件路径, 缩放参数) 列表
+        """
+        if self.cache_client is None or not items:
+            return
+        
+        keys = []
+        for file_path, resize in items:
+            try:
+                with open(file_path, 'rb') as f:
+                    keys.append(self.cache_key(f.read(), resize))
+            except OSError:
+                continue
+        
+        with self._span("cache_lookup", "network", files=len(keys)):
+            hits = self.cache_client.bulk_lookup(keys)
+        if hits is None:
+            return
+        with self._cache_lookup_lock:
+            for key in keys:
+                self._cache_lookup[key] = key in hits
+        self.log(f"共享缓存: {sum(key in hits for key in keys)}/{len(keys)} 个文件已有压缩结果")
+    
+    def _source_provider(self, data, resize, source=None):
+        """返回获取 tinify Source 的函数，首次调用时才上传（缓存命中时通常不需要上传）"""
+        lock = threading.Lock()
+        holder = [source]
+        
+        def get_source():
+            with lock:
+                if holder[0] is None:
+                    holder[0] = self._upload_source(data, resize)
+                return holder[0]
+        return get_source
+    
+    def _compress_with_cache(self, data, resize=None):
+        """先查共享缓存，未命中时调用 API 并发布结果
+
+        返回 (压缩结果, Source 获取函数, 缓存键)，未启用共享缓存时缓存键为 None；
+        压缩后没有变小时压缩结果为 None
+        """
+        key = self.cache_key(data, resize) if self.cache_client is not None else None
+        if key is not None:
+            with self._cache_lookup_lock:
+                may_hit = self._cache_lookup.get(key, True)
+            with self._span("cache_get", "network"):
+                cached = self.cache_client.get(key) if may_hit else None
+            if cached is not None and self.verify_output and self.check_result(data, cached, resize) is not None:
+                self.log("警告: 共享缓存中的结果未通过校验，重新压缩")
+                cached = None
+            if cached is not None:
+                self.stats.increment(cache_hits=1)
+                self.log("共享缓存命中，跳过 API 调用")
+                return cached, self._source_provider(data, resize), key
+        
+        source = self._upload_source(data, resize)
+        # 校验通过且确实变小后才发布到共享缓存
+        result = self._finish_result(source, data, resize)
+        if key is not None and result is not None:
+            self.cache_client.put(key, result)
+        return result, self._source_provider(data, resize, source), key
+    
+    def convert_outputs(self, get_source, basePath, compressed_size, cache_key=None, formats=None):
+        """并发生成 convert_formats（或 formats）中的各个格式，写到 basePath + 扩展名
+
+        转换复用已上传的 Source，不会重新上传图片；启用共享缓存时先查缓存。
+        结果不小于压缩后原格式的会被丢弃。
+        """
+        formats = self.convert_formats if formats is None else formats
+        if not formats:
+            return
+        
+        def convert(fmt, mime):
+            if cache_key is not None:
+                cached = self.cache_client.get(f"{cache_key}.{fmt}")
+                if cached is not None:
+                    return cached, True
+            source = get_source()
+            # 只在请求期间占用名额，等待转换结果的压缩线程不占名额，不会互相阻塞
+            with self._api_slots, self._span(f"convert_{fmt}", "network"):
+                return source.convert(type=mime).to_buffer(), False
+        
+        executor = self.get_convert_executor()
+        futures = {}
+        for fmt in formats:
+            fmt = fmt.lower()
+            mime = CONVERT_FORMATS.get(fmt)
+            if mime is None:
+                self.log(f"不支持的转换格式: {fmt}")
+                continue
+            futures[executor.submit(convert, fmt, mime)] = fmt
+        
+        with self._span("convert_wait", formats=len(futures)):
+            done = list(as_completed(futures))
+        for future in done:
+            fmt = futures[future]
+            target = f"{basePath}.{fmt}"
+            try:
+                converted, from_cache = future.result()
+            except Exception as e:
+                self.log(f"格式转换失败 {target}: {str(e)}")
+                continue
+            
+            if len(converted) >= compressed_size:
+                self.log(f"跳过转换 {fmt}: {self.format_file_size(len(converted))} 不小于 {self.format_file_size(compressed_size)}")
+                continue
+            
+            try:
+                with open(target, 'wb') as f:
+                    f.write(converted)
+            except OSError as e:
+                # 只影响这个格式，原图的压缩结果仍然有效
+                self.log(f"格式转换写入失败 {target}: {str(e)}")
+                continue
+            self.stats.increment(converted_files=1)
+            self.log(f"已生成 {fmt}: {target} ({self.format_file_size(len(converted))})")
+            if cache_key is not None and not from_cache:
+                self.cache_client.put(f"{cache_key}.{fmt}", converted)
+    
+    def compress_core(self, inputFile, outputFile, img_width, replace=False, img_height=-1, method=None):
+        """压缩的核心逻辑（简化版本，基于原始 tinypng.py）"""
+        with self._profile_thread(), self._span("compress", file=inputFile):
+            start_time = time.time()
+            tinify = load_tinify()
+            try:
+                # 执行压缩（简化逻辑，直接使用 tinify）
+                self.log(f"正在压缩: {inputFile}")
+                self.log(f"输出文件: {outputFile}")
+                self.log(f"当前 tinify.key: {tinify.key[:10] if tinify.key else 'None'}...")
+
+                with open(inputFile, 'rb') as f:
+                    data = f.read()
+
+                resize = self.resolve_resize(inputFile, img_width, img_height, method)
+                # 结果在内存中校验通过后才会写入，替换模式下原文件不会被损坏的结果覆盖
+                result, get_source, key = self._compress_with_cache(data, resize)
+                if result is None:
+                    self._keep_original(inputFile, outputFile, data, replace, start_time)
+                    # 原图已经是最优的，仍然生成转换格式（WebP / AVIF 通常比原图小）
+                    self.convert_outputs(get_source, self._convert_base(inputFile, outputFile, replace), len(data), key)
+                    return
+
+                try:
+                    with self._span("write"):
+                        with open(outputFile, 'wb') as f:
+                            f.write(result)
+                    if os.path.getsize(outputFile) != len(result):
+                        raise OSError(f"写入不完整: {outputFile}")
+                except OSError:
+                    # 回滚：删除写了一半的输出文件
+                    if os.path.exists(outputFile):
+                        os.remove(outputFile)
+                    raise
+
+                self.log(f"文件保存成功")
+
+                # 获取文件大小用于统计
+                original_size = len(data)
+                compressed_size = len(result)
+                self.update_stats(original_size, compressed_size, True)
+
+                # 如果需要替换原文件
+                if replace:
+                    shutil.move(outputFile, inputFile)
+                    self.log(f"已替换原文件: {inputFile}")
+                else:
+                    self.log(f"压缩完成: {outputFile}")
+
+                self.log(f"  原始大小: {self.format_file_size(original_size)} -> 压缩后: {self.format_file_size(compressed_size)}")
+
+                # 生成转换格式，放在压缩结果旁边
+                self.convert_outputs(get_source, self._convert_base(inputFile, outputFile, replace), compressed_size, key)
+
+                if original_size > 0:
+                    self._record_index(inputFile, (original_size - compressed_size) / original_size * 100)
+
+                self._record_file_history(inputFile, original_size, compressed_size, time.time() - start_time)
+
+            except Exception as e:
+                error_msg = f"压缩失败: {str(e)}"
+                self.log(f"压缩失败 {inputFile}: {error_msg}")
+                self.update_stats(0, 0, False)
+                self._record_file_history(inputFile, self.get_file_size(inputFile), 0,
+                                          time.time() - start_time, error_msg)
+                raise RuntimeError(error_msg)
+    
+    def _convert_base(self, inputFile, outputFile, replace):
+        """转换格式文件的路径（不含扩展名），放在压缩结果旁边"""
+        return os.path.splitext(inputFile if replace else outputFile)[0]
+    
+    def missing_conversions(self, inputFile, outputFile, replace):
+        """返回还没有生成的转换格式列表"""
+        basePath = self._convert_base(inputFile, outputFile, replace)
+        return [fmt for fmt in self.convert_formats if not os.path.exists(f"{basePath}.{fmt.lower()}")]
+    
+    def convert_skipped(self, inputFile, outputFile, replace):
+        """跳过压缩的文件补齐缺少的转换格式，文件本身不再压缩
+
+        跳过的文件已是压缩结果，直接上传它进行转换；转换格式都已存在时不产生网络请求。
+        """
+        formats = self.missing_conversions(inputFile, outputFile, replace)
+        if not formats or self.stop_event.is_set():
+            return
+        try:
+            with self._profile_thread(), self._span("convert_skipped", file=inputFile):
+                with open(inputFile, 'rb') as f:
+                    data = f.read()
+                basePath = self._convert_base(inputFile, outputFile, replace)
+                os.makedirs(os.path.dirname(basePath) or ".", exist_ok=True)
+                key = self.cache_key(data) if self.cache_client is not None else None
+                self.log(f"补齐转换格式 {', '.join(formats)}: {inputFile}")
+                self.convert_outputs(self._source_provider(data, None), basePath, len(data), key, formats)
+        except Exception as e:
+            # 转换失败不影响跳过的原文件
+            self.log(f"格式转换失败 {inputFile}: {str(e)}")
+    
+    def _keep_original(self, inputFile, outputFile, data, replace, start_time):
+        """压缩后没有变小：保留原图并按跳过计数，记录节省比例 0 以便下次直接跳过"""
+        self.log(f"压缩后没有变小，保留原文件: {inputFile}")
+        if not replace:
+            # 输出目录中仍然放一份原图，保持输出完整
+            with open(outputFile, 'wb') as f:
+                f.write(data)
+        self.add_skipped()
+        self._record_index(inputFile, 0.0)
+        self._record_file_history(inputFile, len(data), len(data), time.time() - start_time)
+    
+    def compress_file(self, inputFile, width=-1, replace=False, height=-1, method=None):
         """压缩单个文件（简化版本，基于原始 tinypng.py）"""
         self.log(f"开始压缩文件: {inputFile}")
         
         if not os.path.isfile(inputFile):
             self.log(f"文件不存在: {inputFile}")
-            self.stats['skipped_files'] += 1
+            self.add_skipped()
             return
         
         dirname = os.path.dirname(inputFile)
@@ -384,23 +1425,124 @@ class TinyPNGCompressor:
         # 忽略 .meta 文件
         if fileSuffix == '.meta':
             self.log(f"跳过 .meta 文件: {inputFile}")
-            self.stats['skipped_files'] += 1
+            self.add_skipped()
+            return
+        
+        # zip 压缩包：作为虚拟目录处理
+        if fileSuffix.lower() == '.zip':
+            if replace:
+                self.compress_archive(inputFile, os.path.join(dirname, f"temp_{basename}"), width, True, height, method)
+            else:
+                self.compress_archive(inputFile, os.path.join(dirname, f"tiny_{basename}"), width, False, height, method)
             return
         
         if fileSuffix in ['.png', '.jpg', '.jpeg']:
+            if self.should_skip(inputFile):
+                self.add_skipped()
+                outputFile = os.path.join(dirname, f"temp_{basename}" if replace else f"tiny_{basename}")
+                self.convert_skipped(inputFile, outputFile, replace)
+                return
+            
+            if self.unity_mode:
+                reason, _ = self.unity_recompression_reason(inputFile)
+                if reason is not None:
+                    self.log(f"跳过 Unity 会重新压缩的纹理（{reason}）: {inputFile}")
+                    self.add_skipped()
+                    self.stats.increment(unity_skipped=1)
+                    return
+            
             if replace:
                 # 替换模式：先压缩到临时文件，然后替换原文件
                 temp_output = os.path.join(dirname, f"temp_{basename}")
-                self.compress_core(inputFile, temp_output, width, True)
+                self.get_executor().submit(self.compress_core, inputFile, temp_output, width, True, height, method).result()
             else:
                 # 非替换模式：压缩到 tiny_ 前缀文件
                 outputFile = os.path.join(dirname, f"tiny_{basename}")
-                self.compress_core(inputFile, outputFile, width, False)
+                self.get_executor().submit(self.compress_core, inputFile, outputFile, width, False, height, method).result()
         else:
             self.log(f"不支持的文件类型: {fileSuffix}")
-            self.stats['skipped_files'] += 1
+            self.add_skipped()
+    
+    def _run_git(self, args, cwd):
+        """执行 git 命令并返回输出（bytes），失败时抛出 OSError / CalledProcessError"""
+        # 打包成 exe 后运行时不弹出控制台窗口
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        return subprocess.run(["git"] + args, cwd=cwd, capture_output=True, check=True,
+                              timeout=60, creationflags=creationflags).stdout
+    
+    def git_changed_files(self, path):
+        """返回 path 下自 git_since 以来改动过的文件（相对 path 的路径），包括未提交和未跟踪的文件
+
+        path 不在 git 仓库中、git 不可用或版本不存在时返回 None，由调用方回退到完整遍历。
+        """
+        # 以 - 开头的值会被 git 当作选项
+        if self.git_since.startswith("-"):
+            self.log(f"无效的 git 版本: {self.git_since}，改为完整扫描")
+            return None
+        
+        try:
+            top = os.fsdecode(self._run_git(["rev-parse", "--show-toplevel"], path)).strip()
+            # 先解析为提交哈希，之后只把哈希传给 git diff
+            commit = os.fsdecode(self._run_git(["rev-parse", "--verify", "--quiet", f"{self.git_since}^{{commit}}"], path)).strip()
+            # 与工作区比较，已修改但未提交的文件也包含在内；删除的文件不需要处理
+            diff = self._run_git(["diff", "--name-only", "-z", "--diff-filter=ACMRT", commit, "--", "."], path)
+            status = self._run_git(["status", "--porcelain", "-z", "--untracked-files=all", "--", "."], path)
+        except (OSError, subprocess.SubprocessError) as e:
+            stderr = getattr(e, "stderr", None)
+            if stderr:
+                reason = os.fsdecode(stderr).strip()
+            elif isinstance(e, subprocess.CalledProcessError):
+                # rev-parse --quiet 找不到版本时没有输出
+                reason = f"找不到版本 {self.git_since}"
+            else:
+                reason = str(e)
+            self.log(f"无法获取 git 改动（{reason}），改为完整扫描")
+            return None
+        
+        # 两个命令输出的路径都相对于仓库根目录
+        names = set(os.fsdecode(name) for name in diff.split(b"\0") if name)
+        entries = status.split(b"\0")
+        index = 0
+        while index < len(entries):
+            entry = os.fsdecode(entries[index])
+            index += 1
+            if len(entry) < 4:
+                continue
+            code, name = entry[:2], entry[3:]
+            if code[0] in "RC":
+                index += 1  # 重命名 / 复制后面跟着原路径
+            if "D" not in code:
+                names.add(name)
+        
+        base = os.path.realpath(path)
+        changed = []
+        for name in sorted(names):
+            full_path = os.path.join(top, name)
+            if os.path.isfile(full_path):
+                changed.append(os.path.relpath(os.path.realpath(full_path), base))
+        return changed
+    
+    def _walk_candidates(self, path):
+        """与 os.walk 相同的 (目录, 子目录, 文件) 序列，第一项总是 path 本身
+
+        设置了 git_since 且 path 在 git 仓库中时只包含改动过的文件，不遍历整个目录树。
+        """
+        changed = self.git_changed_files(path) if self.git_since else None
+        if changed is None:
+            yield from os.walk(path)
+            return
+        
+        self.log(f"git 改动检测: 自 {self.git_since} 以来有 {len(changed)} 个文件改动")
+        groups = {}
+        for relative_path in changed:
+            directory, name = os.path.split(relative_path)
+            groups.setdefault(directory, []).append(name)
+        
+        yield path, [], groups.pop("", [])
+        for directory in sorted(groups):
+            yield os.path.join(path, directory), [], groups[directory]
     
-    def _process_directory_files(self, path, width, replace, recursive=False):
+    def _process_directory_files(self, path, width, replace, recursive=False, height=-1, method=None):
         """处理目录中的文件（简化版本，基于原始 tinypng.py）"""
         if not os.path.isdir(path):
             self.log(f"目录不存在: {path}")
@@ -417,66 +1559,255 @@ class TinyPNGCompressor:
             self.log(f"非替换模式：源路径: {fromFilePath}")
             self.log(f"输出路径: {toFilePath}")
         
-        for root, dirs, files in os.walk(fromFilePath):
-            self.log(f"处理目录: {root}")
-            self.log(f"子目录: {dirs}")
-            self.log(f"文件: {files}")
-            
-            for name in files:
-                fileName, fileSuffix = os.path.splitext(name)
-                # 忽略 .meta 文件
-                if fileSuffix == '.meta':
-                    continue
+        tasks = []  # (输入文件, 输出文件, 是否替换)
+        convert_tasks = []  # 跳过压缩但缺少转换格式的 (输入文件, 输出文件, 是否替换)
+        archives = []  # (压缩包, 输出路径)，在普通文件提交后处理
+        
+        with self._span("walk", "filesystem", path=fromFilePath):
+            for root, dirs, files in self._walk_candidates(fromFilePath):
+                if self.stop_event.is_set():
+                    break
+                
+                if not replace:
+                    # 不处理上次运行的输出目录，否则其中的 zip 包每次都会再输出一层
+                    if root == toFilePath or root.startswith(toFilePath + os.sep):
+                        continue
+                    dirs[:] = [name for name in dirs if os.path.join(root, name) != toFilePath]
+                
+                self.log(f"处理目录: {root}")
+                self.log(f"子目录: {dirs}")
+                self.log(f"文件: {files}")
                 
-                if fileSuffix in ['.png', '.jpg', '.jpeg']:
-                    inputFile = os.path.join(root, name)
+                for name in files:
+                    fileName, fileSuffix = os.path.splitext(name)
+                    # 忽略 .meta 文件
+                    if fileSuffix == '.meta':
+                        continue
                     
-                    if replace:
-                        # 替换模式：先压缩到临时文件，然后替换原文件
-                        temp_output = os.path.join(os.path.dirname(inputFile), f"temp_{name}")
-                        self.compress_core(inputFile, temp_output, width, True)
-                    else:
-                        # 非替换模式：压缩到 tiny 子目录
-                        toFullPath = toFilePath + root[len(fromFilePath):]
-                        toFullName = os.path.join(toFullPath, name)
+                    if fileSuffix.lower() == '.zip':
+                        inputFile = os.path.join(root, name)
+                        if replace:
+                            archives.append((inputFile, os.path.join(root, f"temp_{name}")))
+                        else:
+                            toFullPath = toFilePath + root[len(fromFilePath):]
+                            os.makedirs(toFullPath, exist_ok=True)
+                            archives.append((inputFile, os.path.join(toFullPath, name)))
+                        continue
+                    
+                    if fileSuffix in ['.png', '.jpg', '.jpeg']:
+                        inputFile = os.path.join(root, name)
                         
-                        if not os.path.isdir(toFullPath):
+                        if replace:
+                            # 替换模式：先压缩到临时文件，然后替换原文件
+                            task = (inputFile, os.path.join(os.path.dirname(inputFile), f"temp_{name}"), True)
+                        else:
+                            # 非替换模式：压缩到 tiny 子目录
+                            toFullPath = toFilePath + root[len(fromFilePath):]
+                            task = (inputFile, os.path.join(toFullPath, name), False)
+                        
+                        if self.should_skip(inputFile):
+                            self.add_skipped()
+                            if self.convert_formats and self.missing_conversions(*task):
+                                convert_tasks.append(task)
+                            continue
+                        
+                        if not replace and not os.path.isdir(toFullPath):
                             os.makedirs(toFullPath, exist_ok=True)
                         
-                        self.compress_core(inputFile, toFullName, width, False)
-            
-            if not recursive:
-                break  # 仅遍历当前目录
+                        tasks.append(task)
+                
+                if not recursive:
+                    break  # 仅遍历当前目录
+        
+        if self.unity_mode:
+            tasks = self.plan_unity_tasks(tasks)
+        
+        # 启用共享缓存时，整个目录的文件一次批量查询
+        self.prefetch_cache([(task[0], self.resolve_resize(task[0], width, height, method)) for task in tasks])
+        
+        executor = self.get_executor()
+        futures = {}  # future -> 原始文件大小，用于估算剩余时间
+        for inputFile, outputFile, task_replace in tasks:
+            future = executor.submit(self._compress_task, inputFile, outputFile, width, task_replace, height, method)
+            futures[future] = self.get_file_size(inputFile)
+        convert_futures = [executor.submit(self.convert_skipped, *task) for task in convert_tasks]
+        
+        # 压缩包的成员同样提交到共享线程池，与上面的文件并行压缩
+        for archive, output in archives:
+            if self.stop_event.is_set():
+                break
+            self.compress_archive(archive, output, width, replace, height, method)
+        
+        # 等待本目录提交的任务完成（线程池由所有任务共享）
+        self._wait_with_progress(futures)
+        for future in as_completed(convert_futures):
+            future.result()
+        self.flush_index()
+    
+    def compress_archive(self, archivePath, outputPath, width=-1, replace=False, height=-1, method=None):
+        """压缩 zip 包中的图片，直接从成员读取并写入新的 zip，不解压到磁盘
+
+        图片成员提交到共享线程池并发压缩，其他成员原样复制。
+        成员按原包中的顺序写入，相同输入得到相同的输出包。
+        replace=True 时 outputPath 为临时文件，完成后替换原压缩包。
+        """
+        self.log(f"开始压缩 zip 包: {archivePath}")
+        
+        pending = collections.deque()  # 按原顺序排队等待写入的 (ZipInfo, 原始数据, future 或 None)
+        try:
+            with zipfile.ZipFile(archivePath, 'r') as src, zipfile.ZipFile(outputPath, 'w') as dst:
+                executor = self.get_executor()
+                # 限制同时在内存中的成员数量
+                max_pending = self.max_workers * 2
+                
+                for info in src.infolist():
+                    _, suffix = os.path.splitext(info.filename)
+                    if info.is_dir() or suffix.lower() not in ['.png', '.jpg', '.jpeg']:
+                        if not pending:
+                            # 前面没有等待中的成员：直接流式复制
+                            if info.is_dir():
+                                dst.writestr(info, b"")
+                            else:
+                                with src.open(info) as fsrc, dst.open(info, 'w') as fdst:
+                                    shutil.copyfileobj(fsrc, fdst)
+                            continue
+                        data = b"" if info.is_dir() else src.read(info)
+                        pending.append((info, data, None))
+                    else:
+                        data = src.read(info)
+                        future = None
+                        if self.stop_event.is_set() or (self.adaptive_skip and self.has_compressed_marker(data)):
+                            self.add_skipped()
+                        else:
+                            # 目录缩放规则按 zip 包内的路径匹配
+                            resize = self.resolve_resize(os.path.join(archivePath, info.filename), width, height, method)
+                            future = executor.submit(self._compress_member, archivePath, info.filename, data, resize)
+                        pending.append((info, data, future))
+                    
+                    if len(pending) >= max_pending:
+                        self._write_next_member(dst, pending)
+                
+                while pending:
+                    self._write_next_member(dst, pending)
+        except Exception as e:
+            # 加密成员（RuntimeError）、不支持的压缩方式（NotImplementedError）等都按整个包失败处理
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            self.log(f"zip 包处理失败 {archivePath}: {str(e)}")
+            if os.path.exists(outputPath):
+                os.remove(outputPath)
+            return
+        
+        if replace:
+            shutil.move(outputPath, archivePath)
+            self.log(f"已替换原压缩包: {archivePath}")
+        else:
+            self.log(f"zip 包压缩完成: {outputPath}")
     
-    def compress_path(self, path, width=-1, replace=False):
+    def _write_next_member(self, dst, pending):
+        """等待最早排队的成员完成并写入输出 zip（ZipFile 写入只在调用线程中进行）"""
+        info, data, future = pending.popleft()
+        result = future.result() if future is not None else None
+        # 压缩失败时保留原始数据，保证输出包完整
+        dst.writestr(info, result if result is not None else data)
+    
+    def _compress_member(self, archivePath, memberName, data, resize):
+        """线程池中压缩单个 zip 成员，失败或没有变小时返回 None（保留原数据）"""
+        start_time = time.time()
+        member_path = f"{archivePath}!{memberName}"
+        with self._profile_thread(), self._span("compress", file=member_path):
+            try:
+                self.log(f"正在压缩: {member_path}")
+                result = self.compress_buffer(data, resize)
+                if result is None:
+                    self.log(f"压缩后没有变小，保留原数据: {member_path}")
+                    self.add_skipped()
+                    return None
+                self.update_stats(len(data), len(result), True)
+                self._record_file_history(member_path, len(data), len(result), time.time() - start_time)
+                self.log(f"  原始大小: {self.format_file_size(len(data))} -> 压缩后: {self.format_file_size(len(result))}")
+                return result
+            except Exception as e:
+                error_msg = f"压缩失败: {str(e)}"
+                self.log(f"压缩失败 {member_path}: {error_msg}")
+                self.update_stats(0, 0, False)
+                self._record_file_history(member_path, len(data), 0, time.time() - start_time, error_msg)
+                return None
+    
+    def _wait_with_progress(self, futures):
+        """等待任务完成，并根据历史速率输出进度和预计剩余时间"""
+        total = len(futures)
+        if total == 0:
+            return
+        
+        remaining_bytes = sum(futures.values())
+        eta = self.estimate_eta(total, remaining_bytes)
+        if eta is not None:
+            self.log(f"共 {total} 个文件待压缩，预计耗时: {self.format_duration(eta)}")
+        
+        # 大约每 10% 输出一次进度
+        report_every = max(1, total // 10)
+        for done, future in enumerate(as_completed(futures), 1):
+            remaining_bytes -= futures[future]
+            if done % report_every == 0 and done < total:
+                eta = self.estimate_eta(total - done, remaining_bytes)
+                eta_text = f"，预计剩余: {self.format_duration(eta)}" if eta is not None else ""
+                self.log(f"进度: {done}/{total}{eta_text}")
+    
+    def _compress_task(self, inputFile, outputFile, width, replace, height=-1, method=None):
+        """线程池中执行的单文件压缩任务，失败已在 compress_core 中记录"""
+        if self.stop_event.is_set():
+            self.add_skipped()
+            return
+        try:
+            self.compress_core(inputFile, outputFile, width, replace, height, method)
+        except RuntimeError:
+            pass
+    
+    def compress_path(self, path, width=-1, replace=False, height=-1, method=None):
         """压缩目录下的图片（当前层级，简化版本）"""
         self.log(f"开始压缩目录: {path}")
-        self._process_directory_files(path, width, replace, recursive=False)
+        with self._profile_thread():
+            self._process_directory_files(path, width, replace, False, height, method)
     
-    def compress_path_recursive(self, path, width=-1, replace=False):
+    def compress_path_recursive(self, path, width=-1, replace=False, height=-1, method=None):
         """递归压缩目录及其子目录下的图片（简化版本）"""
         self.log(f"开始递归压缩目录: {path}")
-        self._process_directory_files(path, width, replace, recursive=True)
+        with self._profile_thread():
+            self._process_directory_files(path, width, replace, True, height, method)
+    
+    def _check_api(self):
+        """检查 API Key 和 API 连接（内部方法）"""
+        if not self.api_key:
+            return "❌ API Key 未设置"
+        success, message, _ = self.validate_api_key()
+        if not success:
+            return f"❌ API 连接问题: {message}"
+        return "✅ API 连接正常"
     
-    def _check_network_and_tls(self, issues):
-        """检查网络连接和 TLS 证书（内部方法）"""
-        # 检查网络连接
+    def _check_network(self):
+        """检查网络连接（内部方法）"""
+        import urllib.request
+        import urllib.error
         try:
-            import urllib.request
             urllib.request.urlopen('https://api.tinify.com', timeout=5)
-            issues.append("✅ 网络连接正常")
-        except:
-            issues.append("❌ 网络连接失败")
-        
-        # 检查 TLS 证书
+        except urllib.error.HTTPError:
+            # 服务器有响应（如 404），说明网络是通的
+            pass
+        except Exception:
+            return "❌ 网络连接失败"
+        return "✅ 网络连接正常"
+    
+    def _check_tls(self):
+        """检查 TLS 证书（内部方法）"""
         try:
             import certifi
             certifi_path = certifi.where()
             if os.path.exists(certifi_path):
-                issues.append(f"✅ TLS 证书文件存在: {os.path.basename(certifi_path)}")
-            else:
-                issues.append("❌ TLS 证书文件不存在")
+                return f"✅ TLS 证书文件存在: {os.path.basename(certifi_path)}"
+            return "❌ TLS 证书文件不存在"
         except ImportError:
-            issues.append("❌ certifi 库未安装")
+            return "❌ certifi 库未安装"
         except Exception as e:
-            issues.append(f"❌ TLS 证书检查失败: {str(e)}")
\ No newline at end of file
+            return f"❌ TLS 证书检查失败: {str(e)}"
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import sqlite3
+import threading
+import time
+
+
+class RunHistory:
+    """本地 SQLite 运行历史：记录每次运行及每个文件的压缩结果"""
+
+    def __init__(self, db_path="tinypng_history.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_tables()
+
+    def _create_tables(self):
+        """创建数据表"""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT,
+                    started_at REAL,
+                    finished_at REAL,
+                    total_files INTEGER DEFAULT 0,
+                    compressed_files INTEGER DEFAULT 0,
+                    skipped_files INTEGER DEFAULT 0,
+                    failed_files INTEGER DEFAULT 0,
+                    original_size INTEGER DEFAULT 0,
+                    compressed_size INTEGER DEFAULT 0
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id INTEGER,
+                    path TEXT,
+                    original_size INTEGER,
+                    compressed_size INTEGER,
+                    duration REAL,
+                    error TEXT,
+                    created_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_run ON files (run_id)")
+
+    def start_run(self, label=""):
+        """开始一次运行，返回运行 ID"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (label, started_at) VALUES (?, ?)", (label, time.time()))
+            return cursor.lastrowid
+
+    def record_file(self, run_id, path, original_size, compressed_size, duration, error=None):
+        """记录单个文件的压缩结果"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO files (run_id, path, original_size, compressed_size, duration, error, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, path, original_size, compressed_size, duration, error, time.time()))
+
+    def finish_run(self, run_id, stats):
+        """结束运行并保存汇总统计"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ?, total_files = ?, compressed_files = ?, skipped_files = ?, "
+                "failed_files = ?, original_size = ?, compressed_size = ? WHERE id = ?",
+                (time.time(), stats['total_files'], stats['compressed_files'], stats['skipped_files'],
+                 stats['failed_files'], stats['original_size'], stats['compressed_size'], run_id))
+
+    def recent_runs(self, limit=20):
+        """获取最近的运行记录（最新在前）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM runs WHERE finished_at IS NOT NULL ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def average_rates(self, sample_size=500):
+        """根据最近成功压缩的文件计算单线程平均速率
+
+        返回 (每秒字节数, 每个文件秒数)，没有历史数据时返回 (None, None)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT SUM(original_size) AS bytes, SUM(duration) AS seconds, COUNT(*) AS files FROM ("
+                "SELECT original_size, duration FROM files WHERE error IS NULL AND duration > 0 "
+                "ORDER BY id DESC LIMIT ?)", (sample_size,)).fetchone()
+        if not row or not row['files'] or not row['seconds']:
+            return None, None
+        return row['bytes'] / row['seconds'], row['seconds'] / row['files']
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
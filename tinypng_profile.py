@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""性能分析：cProfile 统计和 Chrome trace 时间线
+
+时间线文件可以用 chrome://tracing 或 https://ui.perfetto.dev 打开，
+.prof 文件可以用 python -m pstats 或 snakeviz 查看。
+"""
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+
+
+class RunProfiler:
+    """一次运行的性能分析器
+
+    每个线程使用独立的 cProfile（cProfile 只统计启用它的线程），结束时合并；
+    span() 记录的区间写成 Chrome trace 格式，每个工作线程一条时间线。
+    """
+
+    def __init__(self, use_cprofile=True):
+        self.use_cprofile = use_cprofile
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._events = []
+        self._thread_names = {}
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._cprofile_warned = False
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1000000
+
+    @contextlib.contextmanager
+    def span(self, name, category="tinypng", **args):
+        """记录一个时间区间（嵌套的区间在时间线中显示为层级）"""
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            with self._lock:
+                self._thread_names[tid] = threading.current_thread().name
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            event = {"name": name, "cat": category, "ph": "X", "pid": self._pid, "tid": tid,
+                     "ts": round(start, 1), "dur": round(self._now_us() - start, 1)}
+            if args:
+                event["args"] = args
+            with self._lock:
+                self._events.append(event)
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        """在当前线程启用 cProfile（同一线程内嵌套调用只启用一次）"""
+        depth = getattr(self._local, "depth", 0)
+        if not self.use_cprofile or depth > 0:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = cProfile.Profile()
+            self._local.profile = profile
+            with self._lock:
+                self._profiles.append(profile)
+
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 同一时间只能有一个 cProfile 处于启用状态，其余线程只记录时间线
+            profile = None
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            if profile is not None:
+                profile.disable()
+
+    def merged_stats(self):
+        """合并所有线程的 cProfile 数据，没有数据时返回 None"""
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 从未启用过的 Profile 没有数据
+                continue
+        return stats
+
+    def trace_data(self):
+        """返回 Chrome trace 格式的数据"""
+        with self._lock:
+            events = list(self._events)
+            names = dict(self._thread_names)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                    for tid, name in names.items()]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def summary(self, limit=30):
+        """按累计耗时排序的 cProfile 摘要文本"""
+        stats = self.merged_stats()
+        if stats is None:
+            return ""
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def save(self, base_path):
+        """保存 <base>.prof、<base>_profile.txt 和 <base>_trace.json，返回保存的文件列表"""
+        saved = []
+        stats = self.merged_stats()
+        if stats is not None:
+            stats.dump_stats(f"{base_path}.prof")
+            saved.append(f"{base_path}.prof")
+            with open(f"{base_path}_profile.txt", 'w', encoding='utf-8') as f:
+                f.write(self.summary())
+            saved.append(f"{base_path}_profile.txt")
+
+        with open(f"{base_path}_trace.json", 'w', encoding='utf-8') as f:
+            json.dump(self.trace_data(), f)
+        saved.append(f"{base_path}_trace.json")
+        return saved
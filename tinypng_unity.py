@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""读取 Unity 纹理的 .meta 导入设置
+
+Unity 构建时会把源图片重新编码成平台纹理格式。导入设置为压缩格式（DXT / ETC / ASTC 等）的纹理，
+源文件再怎么压缩也不影响构建结果，只会消耗 API 次数。
+"""
+
+import re
+
+# 非压缩的 TextureFormat 取值（Alpha8、ARGB4444、RGB24、RGBA32、ARGB32、RGB565、R16、RGBA4444、BGRA32、
+# 半精度 / 单精度浮点、RGB9e5Float、RG16、R8），其余均为块压缩格式
+UNCOMPRESSED_FORMATS = {1, 2, 3, 4, 5, 7, 9, 13, 14, 15, 16, 17, 18, 19, 20, 22, 62, 63}
+# TextureFormat 为 -1 表示自动，由 textureCompression 决定（0 为不压缩）
+AUTOMATIC_FORMAT = -1
+DEFAULT_PLATFORM = "DefaultTexturePlatform"
+
+_TOP_LEVEL_PATTERN = re.compile(r'^  (\w+):[ \t]*(.*)$', re.MULTILINE)
+_PLATFORM_SECTION_PATTERN = re.compile(r'^  platformSettings:[ \t]*\n((?:  - .*\n|    .*\n)*)', re.MULTILINE)
+_PLATFORM_ENTRY_PATTERN = re.compile(r'^  - ', re.MULTILINE)
+_ENTRY_FIELD_PATTERN = re.compile(r'^(?:  - |    )(\w+):[ \t]*(.*)$', re.MULTILINE)
+
+
+def _to_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def read_texture_settings(meta_path):
+    """解析纹理 .meta 文件，返回导入设置字典；文件不存在或不是 TextureImporter 时返回 None
+
+    返回 {"compression": 默认平台的 textureCompression, "packing_tag": spritePackingTag,
+          "platforms": {平台: (textureFormat, textureCompression, 是否覆盖)}}
+    """
+    try:
+        with open(meta_path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    if "TextureImporter:" not in text:
+        return None
+
+    top_level = dict(_TOP_LEVEL_PATTERN.findall(text))
+    platforms = {}
+    section = _PLATFORM_SECTION_PATTERN.search(text)
+    if section:
+        for entry in _PLATFORM_ENTRY_PATTERN.split(section.group(1)):
+            fields = dict(_ENTRY_FIELD_PATTERN.findall("  - " + entry))
+            target = fields.get("buildTarget")
+            if target:
+                platforms[target] = (_to_int(fields.get("textureFormat"), AUTOMATIC_FORMAT),
+                                     _to_int(fields.get("textureCompression")),
+                                     fields.get("overridden", "0").strip() == "1")
+
+    # 新版本 Unity 把默认压缩设置放在 DefaultTexturePlatform 中，旧版本在顶层
+    compression = _to_int(top_level.get("textureCompression"), 1)
+    if DEFAULT_PLATFORM in platforms and platforms[DEFAULT_PLATFORM][1] is not None:
+        compression = platforms[DEFAULT_PLATFORM][1]
+
+    return {
+        "compression": compression,
+        "packing_tag": top_level.get("spritePackingTag", "").strip(),
+        "platforms": platforms
+    }
+
+
+def _is_compressed(texture_format, compression):
+    if texture_format == AUTOMATIC_FORMAT:
+        return compression != 0
+    return texture_format not in UNCOMPRESSED_FORMATS
+
+
+def recompression_reason(settings, build_targets=None):
+    """Unity 在所有目标平台上都会重新压缩该纹理时返回原因，否则返回 None
+
+    build_targets 为需要考虑的平台名（如 ["Android", "iPhone"]），为空时考虑默认平台和所有覆盖了设置的平台。
+    """
+    if settings is None:
+        return None
+
+    overrides = {target: (texture_format, compression)
+                 for target, (texture_format, compression, overridden) in settings["platforms"].items()
+                 if overridden and target != DEFAULT_PLATFORM}
+    targets = list(build_targets) if build_targets else [DEFAULT_PLATFORM] + sorted(overrides)
+
+    for target in targets:
+        if target in overrides:
+            texture_format, compression = overrides[target]
+            if not _is_compressed(texture_format, settings["compression"] if compression is None else compression):
+                return None
+        elif settings["compression"] == 0:
+            return None
+
+    return f"导入设置为压缩格式（{', '.join(targets)}）"